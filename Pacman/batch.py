@@ -0,0 +1,226 @@
+"""Play many seeded headless games across all CPU cores and stream the results to disk.
+
+Single run with one ghost line-up:
+
+    python batch.py --games 10000 --difficulty hard --ghosts astar,bfs,dfs,random --out results.jsonl
+
+Tournament, one line-up of four identical ghosts per algorithm on the same seeds:
+
+    python batch.py --tournament --games 5000 --difficulty hard --out tournament.csv
+
+Every finished game is written (and flushed) as one CSV or JSONL row as soon as
+a worker returns it; only running totals are kept in memory for the summary.
+"""
+import argparse
+import csv
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from maze import DIRECTIONS
+from planner import NODE_BUDGET, LookaheadPlanner
+from simulation import DEFAULT_GHOSTS, Difficulty, Simulator
+
+ALGORITHMS = ["astar", "bfs", "dfs", "dstar", "random"]
+PLANNERS = ["greedy", "lookahead"]
+DIFFICULTIES = {"easy": Difficulty.EASY, "medium": Difficulty.MEDIUM, "hard": Difficulty.HARD}
+SPAWN_CELLS = [(x, y) for x, y, _, _ in DEFAULT_GHOSTS]
+DEFAULT_LINEUP = [algorithm for _, _, _, algorithm in DEFAULT_GHOSTS]
+
+FIELDS = ["config", "seed", "difficulty", "autoplay", "planner", "win", "game_over", "score",
+          "lives_lost", "ticks"] + [f"captures_{algorithm}" for algorithm in ALGORITHMS]
+
+
+class RandomWalker:
+    """Stand-in player for runs without autoplay: keeps going straight and picks a random
+    open direction at junctions and dead ends"""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+
+    def __call__(self, state):
+        pacman, maze = state.pacman, state.board.maze
+        options = [d for d in DIRECTIONS if not maze.is_wall(pacman.x + d[0], pacman.y + d[1])]
+        if pacman.direction in options and len(options) <= 2:
+            return None  # Corridor: keep going
+        return self.rng.choice(options) if options else None
+
+
+def ghost_lineup(algorithms):
+    """Ghost specs for a list of algorithm names, spread over the spawn cells"""
+    return [(*SPAWN_CELLS[i % len(SPAWN_CELLS)], None, algorithm) for i, algorithm in enumerate(algorithms)]
+
+
+def play_game(job):
+    """Worker entry point: play one game described by a plain dict and return its result row"""
+    controller = None if job["autoplay"] else RandomWalker(job["seed"])
+    planner = None
+    if job["planner"] == "lookahead":
+        # Cut by nodes, not the clock, so a seed plays the same game however busy the machine is
+        planner = LookaheadPlanner(max_depth=job["depth"], node_budget=job["nodes"])
+    simulator = Simulator(DIFFICULTIES[job["difficulty"]], job["autoplay"], ghost_lineup(job["ghosts"]),
+                          job["max_ticks"], controller, planner)
+    result = simulator.play(job["seed"])
+    row = {
+        "config": job["config"],
+        "seed": job["seed"],
+        "difficulty": job["difficulty"],
+        "autoplay": job["autoplay"],
+        "planner": job["planner"] if job["autoplay"] else "none",  # The random walker plans nothing
+    }
+    for field in ("win", "game_over", "score", "lives_lost", "ticks"):
+        row[field] = result[field]
+    for algorithm in ALGORITHMS:
+        row[f"captures_{algorithm}"] = result["captures"].get(algorithm, 0)
+    return row
+
+
+class ResultWriter:
+    """Append rows to a .csv or .jsonl file, flushing each one so partial runs are usable"""
+
+    def __init__(self, path):
+        self.file = open(path, "w", newline="")
+        self.jsonl = path.endswith(".jsonl")
+        if not self.jsonl:
+            self.writer = csv.DictWriter(self.file, fieldnames=FIELDS)
+            self.writer.writeheader()
+
+    def write(self, row):
+        if self.jsonl:
+            self.file.write(json.dumps(row) + "\n")
+        else:
+            self.writer.writerow(row)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class Summary:
+    """Running totals for one configuration: win rate, score mean/variance (Welford) and captures"""
+
+    def __init__(self):
+        self.games = 0
+        self.wins = 0
+        self.score_mean = 0.0
+        self.score_m2 = 0.0
+        self.lives_lost = 0
+        self.ticks = 0
+        self.captures = dict.fromkeys(ALGORITHMS, 0)
+
+    def add(self, row):
+        self.games += 1
+        self.wins += bool(row["win"])
+        delta = row["score"] - self.score_mean
+        self.score_mean += delta / self.games
+        self.score_m2 += delta * (row["score"] - self.score_mean)
+        self.lives_lost += row["lives_lost"]
+        self.ticks += row["ticks"]
+        for algorithm in ALGORITHMS:
+            self.captures[algorithm] += row[f"captures_{algorithm}"]
+
+    def win_interval(self, z=1.96):
+        """Wilson score interval for the win rate"""
+        if not self.games:
+            return 0.0, 0.0
+        p = self.wins / self.games
+        center = (p + z * z / (2 * self.games)) / (1 + z * z / self.games)
+        margin = z * math.sqrt(p * (1 - p) / self.games + z * z / (4 * self.games ** 2)) / (1 + z * z / self.games)
+        return max(0.0, center - margin), min(1.0, center + margin)
+
+    def score_margin(self, z=1.96):
+        if self.games < 2:
+            return 0.0
+        return z * math.sqrt(self.score_m2 / (self.games - 1) / self.games)
+
+
+def make_jobs(configs, games, seed, difficulty, autoplay, max_ticks, planner="greedy", depth=10,
+              nodes=NODE_BUDGET):
+    """Lazily yield one job per (game, configuration); configurations share seeds so they are
+    compared on identical games"""
+    for i in range(games):
+        for name, algorithms in configs:
+            yield {"config": name, "ghosts": algorithms, "seed": seed + i, "difficulty": difficulty,
+                   "autoplay": autoplay, "max_ticks": max_ticks, "planner": planner, "depth": depth,
+                   "nodes": nodes}
+
+
+def run_batch(configs, games, out_path, difficulty="hard", autoplay=True, seed=0, workers=None,
+              max_ticks=5000, progress=True, planner="greedy", depth=10, nodes=NODE_BUDGET):
+    """Play games for every configuration in a process pool, streaming rows to out_path.
+    Returns {config name: Summary}"""
+    summaries = {name: Summary() for name, _ in configs}
+    total = games * len(configs)
+    writer = ResultWriter(out_path)
+    started = time.perf_counter()
+    try:
+        with multiprocessing.Pool(workers) as pool:
+            jobs = make_jobs(configs, games, seed, difficulty, autoplay, max_ticks, planner, depth, nodes)
+            for done, row in enumerate(pool.imap_unordered(play_game, jobs, chunksize=16), 1):
+                writer.write(row)
+                summaries[row["config"]].add(row)
+                if progress and (done % 500 == 0 or done == total):
+                    rate = done / (time.perf_counter() - started)
+                    print(f"\r{done}/{total} games ({rate:.0f} games/s)", end="", file=sys.stderr, flush=True)
+    finally:
+        writer.close()
+        if progress:
+            print(file=sys.stderr)
+    return summaries
+
+
+def print_summary(summaries):
+    print(f"{'config':<24} {'games':>6} {'win rate (95% CI)':>24} {'score':>16} {'lives lost':>10} "
+          f"{'ticks':>8}  captures")
+    for name, s in summaries.items():
+        low, high = s.win_interval()
+        captures = " ".join(f"{algorithm}={count}" for algorithm, count in s.captures.items() if count)
+        print(f"{name:<24} {s.games:>6} {s.wins / max(s.games, 1):>7.1%} [{low:.1%}, {high:.1%}] "
+              f"{s.score_mean:>8.0f} ±{s.score_margin():<6.0f} {s.lives_lost / max(s.games, 1):>10.2f} "
+              f"{s.ticks / max(s.games, 1):>8.0f}  {captures}")
+
+
+def parse_ghosts(text):
+    algorithms = [name.strip() for name in text.split(",") if name.strip()]
+    unknown = [name for name in algorithms if name not in ALGORITHMS]
+    if unknown or not algorithms:
+        raise argparse.ArgumentTypeError(f"ghost algorithms must be from {', '.join(ALGORITHMS)}")
+    return algorithms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch runner and ghost tournament for headless Pacman games")
+    parser.add_argument("--games", type=int, default=1000, help="games per configuration")
+    parser.add_argument("--difficulty", choices=sorted(DIFFICULTIES), default="hard")
+    parser.add_argument("--ghosts", type=parse_ghosts, default=DEFAULT_LINEUP,
+                        help="comma-separated ghost algorithms (default: astar,bfs,dfs,random)")
+    parser.add_argument("--tournament", action="store_true",
+                        help="one configuration of four identical ghosts per algorithm")
+    parser.add_argument("--no-autoplay", dest="autoplay", action="store_false",
+                        help="drive Pacman with a seeded random walker instead of autoplay")
+    parser.add_argument("--planner", choices=PLANNERS, default="greedy",
+                        help="autoplay engine: greedy nearest-food or time-budgeted lookahead search")
+    parser.add_argument("--depth", type=int, default=10, help="deepest lookahead search, in ticks")
+    parser.add_argument("--nodes", type=int, default=NODE_BUDGET,
+                        help="lookahead nodes searched per tick; replaces the GUI's time budget so runs repeat")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--max-ticks", type=int, default=5000, help="ticks before a game is called off")
+    parser.add_argument("--out", default="results.jsonl", help="output file, .csv or .jsonl")
+    args = parser.parse_args()
+
+    if args.tournament:
+        configs = [(algorithm, [algorithm] * 4) for algorithm in ALGORITHMS]
+    else:
+        configs = [(",".join(args.ghosts), args.ghosts)]
+    summaries = run_batch(configs, args.games, args.out, args.difficulty, args.autoplay, args.seed,
+                          args.workers, args.max_ticks, planner=args.planner, depth=args.depth, nodes=args.nodes)
+    print_summary(summaries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""Benchmark every pathfinding engine in the game across maze sizes, wall densities and query mixes.
+
+Headless and fully seeded: the same --seed builds the same mazes and the same
+start/target pairs, so result files from different commits line up row by row.
+
+    python benchmarks/bench_pathfinding.py [--seed 1] [--queries 10] [--max-size 512] [--out results.csv]
+
+For every (maze, variant, distribution, engine) it reports the mean nodes
+expanded, wall time per query, peak traced memory and path length.  Times are
+measured in a separate pass from memory, since tracemalloc slows Python down.
+
+The "moving" distribution is a chase: between two queries the start walks
+CHASE_STEPS cells along its last path and the target wanders TARGET_STEPS
+cells, which is what incremental engines like dstar are built for.
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bench_search import generate_maze  # noqa: E402
+from maze import DIRECTIONS, UNREACHABLE, FlowField, Maze  # noqa: E402
+from replan import MovingTargetSearch  # noqa: E402
+from simulation import MAP_LAYOUT, astar  # noqa: E402
+
+SIZES = [(19, 21), (64, 64), (128, 128), (256, 256), (512, 512)]
+
+# Wall layouts per size, as (name, generator kind, parameter)
+VARIANTS = [
+    ("perfect", "maze", 0.0),   # Backtracker maze without loops: one path between any two cells
+    ("loops", "maze", 0.1),     # Pacman-like: some walls knocked out
+    ("open", "maze", 0.3),      # Many loops, few dead ends
+    ("scatter", "random", 0.25),  # Random wall cells at this density; some pairs are unreachable
+]
+
+DISTRIBUTIONS = ["uniform", "near", "far", "moving"]
+NEAR_RADIUS = 8  # Manhattan radius of "near" targets
+FAR_SHARE = 0.1  # "far" queries go from the first to the last tenth of the walkable cells
+CHASE_STEPS = 2   # "moving": cells the start walks along its path between two queries
+TARGET_STEPS = 3  # "moving": cells the target wanders between two queries
+MIN_CHASE = 10    # "moving" sequences are never shorter than this, or nothing is reused
+
+FIELDS = ["commit", "maze", "variant", "distribution", "engine", "queries", "found", "nodes",
+          "ms_mean", "ms_max", "peak_kib", "path_length"]
+
+
+def generate_scatter(width, height, rng, density):
+    """Open field with a wall border and randomly placed wall cells"""
+    grid = [[1] * width for _ in range(height)]
+    for y in range(1, height - 1):
+        for x in range(1, width - 1):
+            grid[y][x] = 1 if rng.random() < density else 2
+    return grid
+
+
+def make_grid(width, height, kind, parameter, rng):
+    if kind == "random":
+        return generate_scatter(width, height, rng, parameter)
+    return generate_maze(width, height, rng, loops=parameter)
+
+
+def make_chase(maze, cells, count, rng):
+    """Query sequence of a chaser following its shortest path toward a wandering target"""
+    start, target = rng.choice(cells), rng.choice(cells)
+    queries = []
+    for _ in range(max(count, MIN_CHASE)):
+        queries.append((start, target))
+        path = maze.bfs(start, target)[1:]
+        if len(path) > CHASE_STEPS:
+            start = path[CHASE_STEPS - 1]
+        else:
+            target = rng.choice(cells)  # Caught (or unreachable): the chase starts over elsewhere
+        for _ in range(TARGET_STEPS):
+            options = maze.neighbors[maze.cell_id(target)]
+            if options:
+                target = maze.cell_pos(rng.choice(options))
+    return queries
+
+
+def make_queries(maze, distribution, count, rng):
+    cells = [maze.cell_pos(cell) for cell in maze.walkable]
+    if distribution == "moving":
+        return make_chase(maze, cells, count, rng)
+    queries = []
+    for _ in range(count):
+        if distribution == "near":
+            start = rng.choice(cells)
+            nearby = [cell for cell in cells if 0 < abs(cell[0] - start[0]) + abs(cell[1] - start[1]) <= NEAR_RADIUS]
+            target = rng.choice(nearby) if nearby else start
+        elif distribution == "far":
+            share = max(1, int(len(cells) * FAR_SHARE))
+            start, target = rng.choice(cells[:share]), rng.choice(cells[-share:])
+        else:
+            start, target = rng.choice(cells), rng.choice(cells)
+        queries.append((start, target))
+    return queries
+
+
+class CountingMaze:
+    """Maze proxy counting wall checks; A* checks every direction once per expanded node"""
+
+    def __init__(self, maze):
+        self.maze = maze
+        self.checks = 0
+
+    def __getattr__(self, name):
+        return getattr(self.maze, name)
+
+    def is_wall(self, x, y):
+        self.checks += 1
+        return self.maze.is_wall(x, y)
+
+
+def visited(maze):
+    """Cells stamped by the most recent Maze.bfs/dfs"""
+    generation = maze._generation
+    return sum(1 for stamp in maze._seen if stamp == generation)
+
+
+# Engines: name -> (search returning a path without start, nodes expanded by that search).
+# Pacman.astar and Ghost.astar both call simulation.astar, so it is measured once; on mazes
+# too big for distance tables it searches the junction graph.
+def astar_nodes(maze, start, target, path):
+    if not maze.has_tables:
+        return maze.junctions.expanded
+    counting = CountingMaze(maze)
+    astar(start, target, counting)
+    return counting.checks // len(DIRECTIONS)
+
+
+def flow_field_nodes(maze, start, target, path):
+    if maze.has_tables:
+        return len(path)  # Sliced from the tables: one lookup per step
+    field = FlowField(maze, target)
+    return sum(1 for d in field.dist if d != UNREACHABLE)
+
+
+searches = {}  # Maze -> MovingTargetSearch of the dstar engine; emptied before every pass
+
+
+def dstar_path(maze, start, target):
+    search = searches.get(maze)
+    if search is None:
+        search = searches[maze] = MovingTargetSearch(maze)
+    return search.path(start, target)
+
+
+ENGINES = {
+    "astar": (lambda maze, s, t: astar(s, t, maze), astar_nodes),
+    "bfs": (lambda maze, s, t: maze.bfs(s, t)[1:], lambda maze, s, t, path: visited(maze)),
+    "dfs": (lambda maze, s, t: maze.dfs(s, t)[1:], lambda maze, s, t, path: visited(maze)),
+    "flow_field": (lambda maze, s, t: FlowField(maze, t).path_from(s), flow_field_nodes),
+    "tables": (lambda maze, s, t: maze.path(s, t), lambda maze, s, t, path: len(path)),
+    "junctions": (lambda maze, s, t: maze.junctions.path(s, t), lambda maze, s, t, path: maze.junctions.expanded),
+    "dstar": (dstar_path, lambda maze, s, t, path: searches[maze].expanded),
+}
+
+
+def measure(maze, engine, queries):
+    search, count_nodes = ENGINES[engine]
+    times, nodes, lengths, found = [], 0, 0, 0
+    searches.clear()  # Incremental engines start every pass from nothing
+    for start, target in queries:
+        began = time.perf_counter()
+        path = search(maze, start, target)
+        times.append(time.perf_counter() - began)
+        nodes += count_nodes(maze, start, target, path)
+        if path or start == target:
+            found += 1
+            lengths += len(path)
+
+    searches.clear()
+    tracemalloc.start()
+    peak = 0
+    for start, target in queries:
+        tracemalloc.reset_peak()
+        search(maze, start, target)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    return {
+        "queries": len(queries),
+        "found": found,
+        "nodes": round(nodes / len(queries), 1),
+        "ms_mean": round(sum(times) / len(times) * 1000, 4),
+        "ms_max": round(max(times) * 1000, 4),
+        "peak_kib": round(peak / 1024, 1),
+        "path_length": round(lengths / found, 1) if found else 0,
+    }
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--queries", type=int, default=10, help="start/target pairs per maze up to 64x64; "
+                        "larger mazes get proportionally fewer, at least 2")
+    parser.add_argument("--max-size", type=int, default=512, help="skip mazes wider than this")
+    parser.add_argument("--engines", default=",".join(ENGINES), help="comma-separated engines to run")
+    parser.add_argument("--out", help="also write the rows to this .csv or .jsonl file")
+    args = parser.parse_args()
+    engines = [name for name in args.engines.split(",") if name in ENGINES]
+
+    commit = current_commit()
+    rows = []
+    print(f"commit {commit}, Python {platform.python_version()}, seed {args.seed}")
+    print(f"{'maze':>9} {'variant':>8} {'dist':>8} {'engine':>10} {'found':>6} {'nodes':>9} "
+          f"{'ms':>9} {'ms max':>9} {'KiB':>9} {'length':>7}")
+    for width, height in SIZES:
+        if width > args.max_size:
+            continue
+        count = max(2, args.queries * 64 * 64 // max(64 * 64, width * height))
+        for variant, kind, parameter in VARIANTS:
+            # Every maze and query set gets its own generator, so skipping sizes or engines
+            # never changes the others
+            rng = random.Random(f"{args.seed}-{width}x{height}-{variant}")
+            if (width, height) == (19, 21) and variant == "loops":
+                grid = MAP_LAYOUT  # The game's own map stands in for the Pacman-like variant
+            else:
+                grid = make_grid(width, height, kind, parameter, rng)
+            maze = Maze(grid)
+            maze.junctions  # Compiled once per map like the tables, so not part of any query's time
+            for distribution in DISTRIBUTIONS:
+                queries = make_queries(maze, distribution, count, rng)
+                for engine in engines:
+                    if engine == "tables" and not maze.has_tables:
+                        continue
+                    row = {"commit": commit, "maze": f"{width}x{height}", "variant": variant,
+                           "distribution": distribution, "engine": engine}
+                    row.update(measure(maze, engine, queries))
+                    rows.append(row)
+                    print(f"{row['maze']:>9} {variant:>8} {distribution:>8} {engine:>10} {row['found']:>6} "
+                          f"{row['nodes']:>9} {row['ms_mean']:>9.3f} {row['ms_max']:>9.3f} "
+                          f"{row['peak_kib']:>9.1f} {row['path_length']:>7}", flush=True)
+
+    if args.out:
+        with open(args.out, "w", newline="") as file:
+            if args.out.endswith(".jsonl"):
+                for row in rows:
+                    file.write(json.dumps(row) + "\n")
+            else:
+                writer = csv.DictWriter(file, fieldnames=FIELDS)
+                writer.writeheader()
+                writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
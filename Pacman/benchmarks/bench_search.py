@@ -0,0 +1,123 @@
+"""Compare the old path-copying BFS/DFS with the parent-pointer versions in maze.py.
+
+Runs headless on the stock 19x21 map and on generated mazes up to 200x200,
+printing wall time and peak traced memory per search for both implementations.
+
+    python benchmarks/bench_search.py [--seed 1] [--queries 20]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from maze import DIRECTIONS, Maze  # noqa: E402
+from simulation import MAP_LAYOUT  # noqa: E402
+
+SIZES = [(19, 21), (50, 50), (100, 100), (200, 200)]
+
+
+def generate_maze(width, height, rng, loops=0.1):
+    """Carve a random maze with a depth-first backtracker, then knock out a share of
+    the remaining walls so there are loops like in a Pacman level"""
+    grid = [[1] * width for _ in range(height)]
+    stack = [(1, 1)]
+    grid[1][1] = 2
+    while stack:
+        x, y = stack[-1]
+        options = [(x + 2 * dx, y + 2 * dy, dx, dy) for dx, dy in DIRECTIONS
+                   if 0 < x + 2 * dx < width - 1 and 0 < y + 2 * dy < height - 1
+                   and grid[y + 2 * dy][x + 2 * dx] == 1]
+        if not options:
+            stack.pop()
+            continue
+        nx, ny, dx, dy = rng.choice(options)
+        grid[y + dy][x + dx] = 2
+        grid[ny][nx] = 2
+        stack.append((nx, ny))
+    for y in range(1, height - 1):
+        for x in range(1, width - 1):
+            if grid[y][x] == 1 and rng.random() < loops:
+                grid[y][x] = 2
+    return grid
+
+
+def legacy_bfs(grid, start, target):
+    """Ghost.bfs before parent pointers: every queue entry carries its own path copy"""
+    width, height = len(grid[0]), len(grid)
+    queue = deque([(start, [])])
+    visited = set([start])
+    while queue:
+        (x, y), path = queue.popleft()
+        if (x, y) == target:
+            return path + [(x, y)]
+        for dx, dy in DIRECTIONS:
+            nx, ny = x + dx, y + dy
+            if (0 <= nx < width and 0 <= ny < height and
+                    grid[ny][nx] != 1 and (nx, ny) not in visited):
+                queue.append(((nx, ny), path + [(x, y)]))
+                visited.add((nx, ny))
+    return []
+
+
+def legacy_dfs(grid, start, target):
+    """Ghost.dfs before parent pointers"""
+    width, height = len(grid[0]), len(grid)
+    stack = [(start, [])]
+    visited = set([start])
+    while stack:
+        (x, y), path = stack.pop()
+        if (x, y) == target:
+            return path + [(x, y)]
+        for dx, dy in DIRECTIONS:
+            nx, ny = x + dx, y + dy
+            if (0 <= nx < width and 0 <= ny < height and
+                    grid[ny][nx] != 1 and (nx, ny) not in visited):
+                stack.append(((nx, ny), path + [(x, y)]))
+                visited.add((nx, ny))
+    return []
+
+
+def measure(search, queries):
+    """Average seconds and peak traced bytes per query; returns the paths for cross-checking"""
+    paths = []
+    tracemalloc.start()
+    peak = 0
+    elapsed = 0.0
+    for start, target in queries:
+        tracemalloc.reset_peak()
+        began = time.perf_counter()
+        paths.append(search(start, target))
+        elapsed += time.perf_counter() - began
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+    return elapsed / len(queries), peak, paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--queries", type=int, default=20, help="start/target pairs per maze")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'maze':>9} {'search':>6} {'old ms':>9} {'new ms':>9} {'speedup':>8} {'old KiB':>10} {'new KiB':>9}")
+    for width, height in SIZES:
+        grid = MAP_LAYOUT if (width, height) == (19, 21) else generate_maze(width, height, rng)
+        maze = Maze(grid)
+        cells = [maze.cell_pos(cell) for cell in maze.walkable]
+        queries = [(rng.choice(cells), rng.choice(cells)) for _ in range(args.queries)]
+        for name, legacy, current in (("bfs", legacy_bfs, maze.bfs), ("dfs", legacy_dfs, maze.dfs)):
+            old_time, old_peak, old_paths = measure(lambda s, t: legacy(grid, s, t), queries)
+            new_time, new_peak, new_paths = measure(current, queries)
+            assert old_paths == new_paths, f"{name} paths differ on {width}x{height}"
+            print(f"{width:>4}x{height:<4} {name:>6} {old_time * 1000:9.2f} {new_time * 1000:9.2f} "
+                  f"{old_time / new_time:7.1f}x {old_peak / 1024:10.1f} {new_peak / 1024:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
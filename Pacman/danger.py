@@ -0,0 +1,92 @@
+"""Threat map over the whole maze, read by autoplay with one lookup per cell.
+
+Each active ghost threatens the cells it can reach within DANGER_HORIZON steps
+by real maze distance, so a ghost behind a wall no longer counts as close.
+Cells ahead of the ghost (reachable through the cell it is about to step to)
+count as they are; cells behind it cost REVERSE_PENALTY extra steps, since the
+ghost first has to turn around.
+
+A ghost's contribution depends only on its cell and heading, and the maze
+never changes, so contributions are computed once per (cell, heading) and
+each tick only the ghosts that moved are subtracted and added again.
+"""
+from array import array
+
+DANGER_HORIZON = 3   # Ghosts further than this many steps away are harmless this tick
+DANGER_WEIGHT = 2    # Threat per step inside the horizon, as in the old Manhattan heuristic
+REVERSE_PENALTY = 1  # Extra steps for a ghost to reach a cell behind it
+
+
+class DangerField:
+    """Summed threat of every cell from the active ghosts, kept current by update()"""
+
+    def __init__(self, maze, horizon=DANGER_HORIZON):
+        self.maze = maze
+        self.horizon = horizon
+        self.threat = array('i', [0]) * maze.size
+        self.keys = []             # Per ghost: the (cell, heading) its contribution was added for, or None
+        self.contributions = {}    # (cell, heading) -> ((cell id, threat), ...)
+
+    def update(self, ghosts, power_mode):
+        """Bring the map up to date with the ghosts' positions; scared or eaten ghosts threaten nothing"""
+        if len(self.keys) < len(ghosts):
+            self.keys.extend([None] * (len(ghosts) - len(self.keys)))
+        for i, ghost in enumerate(ghosts):
+            key = None if power_mode or ghost.eaten else self._key(ghost)
+            if key == self.keys[i]:
+                continue
+            if self.keys[i] is not None:
+                for cell, value in self._contribution(self.keys[i]):
+                    self.threat[cell] -= value
+            if key is not None:
+                for cell, value in self._contribution(key):
+                    self.threat[cell] += value
+            self.keys[i] = key
+
+    def at(self, pos):
+        """Threat at a cell; walls and cells off the map have none"""
+        if self.maze.is_wall(*pos):
+            return 0
+        return self.threat[self.maze.cell_id(pos)]
+
+    def _key(self, ghost):
+        maze = self.maze
+        cell = maze.cell_id((ghost.x, ghost.y))
+        ahead = ghost.path.peek()
+        if ahead is None or ahead == (ghost.x, ghost.y):
+            ahead = (2 * ghost.x - ghost.prev_x, 2 * ghost.y - ghost.prev_y)  # Keep going the way it came
+        ahead = maze.cell_id(ahead) if ahead != (ghost.x, ghost.y) and not maze.is_wall(*ahead) else None
+        if ahead not in maze.neighbors[cell]:
+            ahead = None  # Unknown heading: every direction counts the same
+        return (cell, ahead)
+
+    def _ball(self, cell, radius):
+        """Maze distance from cell to every cell less than radius steps away"""
+        distances = {cell: 0}
+        frontier = [cell]
+        for d in range(1, radius):
+            reached = []
+            for current in frontier:
+                for neighbor in self.maze.neighbors[current]:
+                    if neighbor not in distances:
+                        distances[neighbor] = d
+                        reached.append(neighbor)
+            frontier = reached
+        return distances
+
+    def _contribution(self, key):
+        contribution = self.contributions.get(key)
+        if contribution is None:
+            cell, ahead = key
+            horizon = self.horizon
+            near = self._ball(cell, horizon)
+            via = self._ball(ahead, horizon - 1) if ahead is not None else None
+            contribution = []
+            for target, d in near.items():
+                steps = d
+                if via is not None and d > 0 and via.get(target) != d - 1:
+                    steps += REVERSE_PENALTY
+                if steps < horizon:
+                    contribution.append((target, (horizon - steps) * DANGER_WEIGHT))
+            contribution = self.contributions[key] = tuple(contribution)
+        return contribution
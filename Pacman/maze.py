@@ -0,0 +1,586 @@
+"""Compiled maze topology shared by every pathfinder in the game.
+
+Walls never change while a game is running (only pellets do), so the walkable
+cells, their neighbours and the all-pairs shortest-path tables are built once
+per wall layout.  After that "distance to X" and "next step toward X" are O(1)
+lookups instead of a fresh search over the grid.
+"""
+import heapq
+import itertools
+from array import array
+from collections import OrderedDict, deque
+
+# Directions
+UP = (0, -1)
+DOWN = (0, 1)
+LEFT = (-1, 0)
+RIGHT = (1, 0)
+DIRECTIONS = [UP, DOWN, LEFT, RIGHT]
+
+WALL = 1
+UNREACHABLE = 0xFFFF  # Distance stored for pairs of cells with no path between them
+NO_STEP = 0xFF        # Next-hop stored for a cell paired with itself or an unreachable cell
+
+# The all-pairs tables grow with the square of the walkable cell count, so bigger
+# mazes only get the neighbour lists and fall back to real searches
+MAX_TABLE_CELLS = 2048
+
+FLOW_FIELD_CACHE_SIZE = 8  # Recent targets kept; ghosts chasing the same target share one field
+PATH_CACHE_SIZE = 1024     # Searches remembered by a PathCache before the least recently used is dropped
+
+_versions = itertools.count(1)
+
+
+class Maze:
+    """Static view of a game map: wall mask, neighbour lists and path tables.
+
+    Cells are addressed by a flat id (y * width + x).  Walkable cells also get a
+    compact index that rows and columns of the distance tables are keyed by.
+    """
+
+    def __init__(self, grid):
+        self.height = len(grid)
+        self.width = len(grid[0])
+        self.size = self.width * self.height
+        self.walls = bytearray(1 if value == WALL else 0 for row in grid for value in row)
+        # Every wall layout is compiled into its own Maze, so this number changes exactly when
+        # the walls do; pellets live on the Board and never touch it
+        self.version = next(_versions)
+
+        # Neighbour ids for every walkable cell, in DIRECTIONS order so searches
+        # expand cells exactly like the old grid-scanning code did
+        self.neighbors = [()] * self.size
+        self.walkable = []
+        for cell in range(self.size):
+            if self.walls[cell]:
+                continue
+            self.walkable.append(cell)
+            x, y = cell % self.width, cell // self.width
+            found = []
+            for dx, dy in DIRECTIONS:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < self.width and 0 <= ny < self.height and not self.walls[ny * self.width + nx]:
+                    found.append(ny * self.width + nx)
+            self.neighbors[cell] = tuple(found)
+
+        self.index = array('i', [-1]) * self.size
+        for i, cell in enumerate(self.walkable):
+            self.index[cell] = i
+
+        self.dist = None
+        self.next_hop = None
+        if len(self.walkable) <= MAX_TABLE_CELLS:
+            self._build_tables()
+        self._flow_fields = OrderedDict()
+        self._junctions = None
+        self._farthest = None  # Per cell id: farthest reachable cell from it, -1 until asked for
+
+        # Scratch buffers reused by every bfs/dfs call: a parent pointer per cell and a
+        # generation stamp that marks cells visited by the current search only
+        self._parent = array('i', [-1]) * self.size
+        self._seen = array('L', [0]) * self.size
+        self._generation = 0
+
+    @property
+    def has_tables(self):
+        return self.dist is not None
+
+    @property
+    def junctions(self):
+        """Corridor-compressed JunctionGraph of this maze, built on first use"""
+        if self._junctions is None:
+            self._junctions = JunctionGraph(self)
+        return self._junctions
+
+    def _build_tables(self):
+        """One BFS per walkable cell: row t holds the distance from every cell to t
+        and the direction of the first step toward t"""
+        n = len(self.walkable)
+        self.dist = array('H', [UNREACHABLE]) * (n * n)
+        self.next_hop = array('B', [NO_STEP]) * (n * n)
+        width = self.width
+        step_to = {}  # (from id, to id) -> index into DIRECTIONS
+        for cell in self.walkable:
+            x, y = cell % width, cell // width
+            for d, (dx, dy) in enumerate(DIRECTIONS):
+                step_to[cell, (y + dy) * width + (x + dx)] = d
+
+        for t, target in enumerate(self.walkable):
+            row = t * n
+            self.dist[row + t] = 0
+            queue = deque([target])
+            while queue:
+                current = queue.popleft()
+                current_dist = self.dist[row + self.index[current]]
+                for neighbor in self.neighbors[current]:
+                    slot = row + self.index[neighbor]
+                    if self.dist[slot] == UNREACHABLE:
+                        self.dist[slot] = current_dist + 1
+                        self.next_hop[slot] = step_to[neighbor, current]
+                        queue.append(neighbor)
+
+    def cell_id(self, pos):
+        return pos[1] * self.width + pos[0]
+
+    def cell_pos(self, cell):
+        return (cell % self.width, cell // self.width)
+
+    def is_wall(self, x, y):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return True
+        return self.walls[y * self.width + x] == 1
+
+    def _slot(self, start, target):
+        """Table slot for the pair, or None when there are no tables or either cell is a wall"""
+        if self.dist is None or self.is_wall(*start) or self.is_wall(*target):
+            return None
+        s = self.index[self.cell_id(start)]
+        t = self.index[self.cell_id(target)]
+        return t * len(self.walkable) + s
+
+    def distance(self, start, target):
+        """Maze distance between two cells, or None if unknown or unreachable"""
+        slot = self._slot(start, target)
+        if slot is None or self.dist[slot] == UNREACHABLE:
+            return None
+        return self.dist[slot]
+
+    def next_step(self, start, target):
+        """First cell on a shortest path from start toward target, or None"""
+        slot = self._slot(start, target)
+        if slot is None or self.next_hop[slot] == NO_STEP:
+            return None
+        dx, dy = DIRECTIONS[self.next_hop[slot]]
+        return (start[0] + dx, start[1] + dy)
+
+    def path(self, start, target):
+        """Shortest path in the same format as astar: excludes start, ends at target"""
+        path = []
+        current = start
+        while current != target:
+            current = self.next_step(current, target)
+            if current is None:
+                return []
+            path.append(current)
+        return path
+
+    def _new_search(self):
+        """Start a search on the scratch buffers; cells stamped by earlier searches read as unvisited"""
+        self._generation += 1
+        if self._generation > 0xFFFFFFFF:
+            self._seen = array('L', [0]) * self.size
+            self._generation = 1
+        return self._generation
+
+    def _trace(self, start, target):
+        """Follow parent pointers from target back to start and return [start, ..., target]"""
+        path = []
+        cell = target
+        while cell != start:
+            path.append(self.cell_pos(cell))
+            cell = self._parent[cell]
+        path.append(self.cell_pos(start))
+        path.reverse()
+        return path
+
+    def bfs(self, start, target):
+        """Breadth-first search in the Ghost.bfs format: [start, ..., target], or [] if unreachable"""
+        if start == target:
+            return [start]
+        if self.is_wall(*target):
+            return []
+        generation = self._new_search()
+        seen, parent, neighbors = self._seen, self._parent, self.neighbors
+        source, goal = self.cell_id(start), self.cell_id(target)
+        seen[source] = generation
+        queue = deque([source])
+        while queue:
+            current = queue.popleft()
+            for neighbor in neighbors[current]:
+                if seen[neighbor] != generation:
+                    seen[neighbor] = generation
+                    parent[neighbor] = current
+                    if neighbor == goal:
+                        return self._trace(source, goal)
+                    queue.append(neighbor)
+        return []
+
+    def dfs(self, start, target):
+        """Depth-first search in the Ghost.dfs format: [start, ..., target], or [] if unreachable"""
+        if start == target:
+            return [start]
+        if self.is_wall(*target):
+            return []
+        generation = self._new_search()
+        seen, parent, neighbors = self._seen, self._parent, self.neighbors
+        source, goal = self.cell_id(start), self.cell_id(target)
+        seen[source] = generation
+        stack = [source]
+        while stack:
+            current = stack.pop()
+            if current == goal:
+                return self._trace(source, goal)
+            for neighbor in neighbors[current]:
+                if seen[neighbor] != generation:
+                    seen[neighbor] = generation
+                    parent[neighbor] = current
+                    stack.append(neighbor)
+        return []
+
+    def farthest_from(self, pos):
+        """Reachable cell with the longest maze distance from pos (the first in id order on ties),
+        or None if pos is a wall; worked out once per cell and remembered"""
+        if self.is_wall(*pos):
+            return None
+        if self._farthest is None:
+            self._farthest = array('i', [-1]) * self.size
+        cell = self.cell_id(pos)
+        if self._farthest[cell] < 0:
+            # Distances are symmetric, so the field toward pos holds the distance from pos to every cell
+            best, farthest = -1, cell
+            for i, d in enumerate(self.flow_field(pos).dist):
+                if d != UNREACHABLE and d > best:
+                    best, farthest = d, self.walkable[i]
+            self._farthest[cell] = farthest
+        return self.cell_pos(self._farthest[cell])
+
+    def flow_field(self, target):
+        """Shared FlowField toward target; built once and reused by every caller that asks for it"""
+        field = self._flow_fields.get(target)
+        if field is None:
+            field = self._flow_fields[target] = FlowField(self, target)
+            if len(self._flow_fields) > FLOW_FIELD_CACHE_SIZE:
+                self._flow_fields.popitem(last=False)
+        else:
+            self._flow_fields.move_to_end(target)
+        return field
+
+
+class Path:
+    """A planned route consumed through a cursor, so each step is O(1) instead of list.pop(0).
+
+    The same object is refilled with replace() on every replan, and records the
+    maze it was planned on so validity checks only look at the wall mask again
+    when the layout has changed.
+    """
+
+    def __init__(self, cells=(), target=None, maze=None):
+        self.cells = []
+        self.cursor = 0
+        self.target = None
+        self.maze = None
+        self.replace(cells, target, maze)
+
+    def replace(self, cells, target=None, maze=None):
+        """Reuse this object for a new plan"""
+        self.cells[:] = cells
+        self.cursor = 0
+        self.target = target if target is not None else (self.cells[-1] if self.cells else None)
+        self.maze = maze
+        return self
+
+    def clear(self):
+        self.replace(())
+
+    def snapshot(self):
+        """The remaining plan as an immutable tuple, for restore(); holds the maze's version
+        rather than the maze, so snapshots stay small when pickled"""
+        return (tuple(self.cells[self.cursor:]), self.target, self.maze.version if self.maze is not None else None)
+
+    def restore(self, data, maze=None):
+        """Refill from snapshot(); the plan is bound to maze only if it was made on the same walls"""
+        cells, target, version = data
+        self.replace(cells, target, maze if maze is not None and maze.version == version else None)
+
+    def __len__(self):
+        return len(self.cells) - self.cursor
+
+    def __bool__(self):
+        return self.cursor < len(self.cells)
+
+    def __iter__(self):
+        return iter(self.cells[self.cursor:])
+
+    def peek(self):
+        """Next cell on the path without consuming it, or None when the path is used up"""
+        return self.cells[self.cursor] if self else None
+
+    def advance(self):
+        """Consume and return the next cell"""
+        cell = self.cells[self.cursor]
+        self.cursor += 1
+        return cell
+
+    def is_valid(self, maze, pos):
+        """True if the next cell is reachable from pos in one step (or is pos itself, for
+        paths that start at the mover's cell) and none of the remaining cells is a wall"""
+        next_cell = self.peek()
+        if next_cell is None or abs(next_cell[0] - pos[0]) + abs(next_cell[1] - pos[1]) > 1:
+            return False
+        if maze is not self.maze:
+            if any(maze.is_wall(x, y) for x, y in self):
+                return False
+            self.maze = maze
+        return True
+
+
+class FlowField:
+    """Distance to one target cell and the first step toward it, for every walkable cell.
+
+    Built with a single reverse BFS from the target (or sliced out of the maze
+    tables when they exist), so any number of ghosts chasing the same target
+    read their next step or full path without searching themselves.
+    """
+
+    def __init__(self, maze, target):
+        self.maze = maze
+        self.target = target
+        n = len(maze.walkable)
+        if maze.is_wall(*target):
+            self.dist = array('H', [UNREACHABLE]) * n
+            self.next_hop = array('B', [NO_STEP]) * n
+        elif maze.has_tables:
+            row = maze.index[maze.cell_id(target)] * n
+            self.dist = maze.dist[row:row + n]
+            self.next_hop = maze.next_hop[row:row + n]
+        else:
+            self._flood()
+
+    def _flood(self):
+        maze = self.maze
+        n = len(maze.walkable)
+        self.dist = array('H', [UNREACHABLE]) * n
+        self.next_hop = array('B', [NO_STEP]) * n
+        width = maze.width
+        root = maze.cell_id(self.target)
+        self.dist[maze.index[root]] = 0
+        queue = deque([root])
+        while queue:
+            current = queue.popleft()
+            current_dist = self.dist[maze.index[current]]
+            for neighbor in maze.neighbors[current]:
+                i = maze.index[neighbor]
+                if self.dist[i] == UNREACHABLE:
+                    self.dist[i] = current_dist + 1
+                    # Step from neighbor back to current, as an index into DIRECTIONS
+                    offset = current - neighbor
+                    self.next_hop[i] = 0 if offset == -width else 1 if offset == width else 2 if offset == -1 else 3
+                    queue.append(neighbor)
+
+    def distance(self, pos):
+        """Maze distance from pos to the target, or None if unreachable"""
+        if self.maze.is_wall(*pos):
+            return None
+        d = self.dist[self.maze.index[self.maze.cell_id(pos)]]
+        return None if d == UNREACHABLE else d
+
+    def next_step(self, pos):
+        """First cell on a shortest path from pos toward the target, or None"""
+        if self.maze.is_wall(*pos):
+            return None
+        d = self.next_hop[self.maze.index[self.maze.cell_id(pos)]]
+        if d == NO_STEP:
+            return None
+        dx, dy = DIRECTIONS[d]
+        return (pos[0] + dx, pos[1] + dy)
+
+    def path_from(self, pos):
+        """Shortest path from pos in the same format as astar: excludes pos, ends at the target"""
+        path = []
+        current = pos
+        while current != self.target:
+            current = self.next_step(current)
+            if current is None:
+                return []
+            path.append(current)
+        return path
+
+
+class JunctionGraph:
+    """The maze with every corridor collapsed into one weighted edge.
+
+    Nodes are the cells that do not have exactly two neighbours (junctions and
+    dead ends); each edge keeps the corridor cells between its two nodes so a
+    route over the graph can be expanded back into cells.  Searches then expand
+    one node per junction instead of one per cell.
+    """
+
+    def __init__(self, maze):
+        self.maze = maze
+        self.nodes = [cell for cell in maze.walkable if len(maze.neighbors[cell]) != 2]
+        self.node_index = {cell: i for i, cell in enumerate(self.nodes)}
+        self.edges = []      # (node a, node b, corridor cell ids from a toward b, both ends excluded)
+        self.adjacent = []   # Per node: [(neighbour node, length, edge id), ...]
+        self.edge_of = {}    # Corridor cell id -> (edge id, position in the corridor)
+        self.expanded = 0    # Nodes expanded by the last search, for benchmarks
+
+        for cell in self.nodes:
+            self.adjacent.append([])
+        for cell in self.nodes:
+            self._walk_from(cell)
+        # Loops made only of corridor cells have no node yet: promote one cell of each
+        for cell in maze.walkable:
+            if cell not in self.node_index and cell not in self.edge_of:
+                self.node_index[cell] = len(self.nodes)
+                self.nodes.append(cell)
+                self.adjacent.append([])
+                self._walk_from(cell)
+
+    def _walk_from(self, start):
+        neighbors = self.maze.neighbors
+        for first in neighbors[start]:
+            if first in self.edge_of or (first in self.node_index and first < start):
+                continue  # Corridor (or direct link) already added from its other end
+            cells = []
+            previous, current = start, first
+            while current not in self.node_index:
+                cells.append(current)
+                a, b = neighbors[current]
+                previous, current = current, (b if a == previous else a)
+            edge = len(self.edges)
+            self.edges.append((start, current, tuple(cells)))
+            for position, cell in enumerate(cells):
+                self.edge_of[cell] = (edge, position)
+            length = len(cells) + 1
+            self.adjacent[self.node_index[start]].append((self.node_index[current], length, edge))
+            if current != start or cells:
+                self.adjacent[self.node_index[current]].append((self.node_index[start], length, edge))
+
+    def _exits(self, cell):
+        """Ways from a cell onto the graph: [(node, steps, cell ids walked, ending at the node)]"""
+        if cell in self.node_index:
+            return [(self.node_index[cell], 0, ())]
+        edge, position = self.edge_of[cell]
+        a, b, cells = self.edges[edge]
+        return [(self.node_index[a], position + 1, tuple(reversed(cells[:position])) + (a,)),
+                (self.node_index[b], len(cells) - position, cells[position + 1:] + (b,))]
+
+    def path(self, start, target):
+        """A* over the junction graph; shortest path in the astar format (excludes start, ends at target),
+        or [] if unreachable"""
+        maze = self.maze
+        self.expanded = 0
+        if start == target:
+            return []
+        if maze.is_wall(*start) or maze.is_wall(*target):
+            return []
+        source, goal = maze.cell_id(start), maze.cell_id(target)
+        width = maze.width
+        tx, ty = target
+
+        def heuristic(node):
+            cell = self.nodes[node]
+            return abs(cell % width - tx) + abs(cell // width - ty)
+
+        # Best complete route found so far, as (steps, cell ids after start)
+        best = None
+        if source in self.edge_of and goal in self.edge_of and self.edge_of[source][0] == self.edge_of[goal][0]:
+            edge = self.edges[self.edge_of[source][0]]
+            i, j = self.edge_of[source][1], self.edge_of[goal][1]
+            best = (abs(i - j), edge[2][i + 1:j + 1] if i < j else tuple(reversed(edge[2][j:i])))
+
+        # Arriving at a target node finishes the route; otherwise the target sits on a corridor
+        finish = {}  # node -> (steps from node to target, cell ids walked after the node)
+        for node, steps, cells in self._exits(goal):
+            walk = tuple(reversed(cells[:-1])) + (goal,) if steps else ()
+            if node not in finish or steps < finish[node][0]:
+                finish[node] = (steps, walk)
+
+        g_score = {}
+        came_from = {}  # node -> (previous node or None, cell ids walked to reach it)
+        open_set = []
+        for node, steps, cells in self._exits(source):
+            if node not in g_score or steps < g_score[node]:
+                g_score[node] = steps
+                came_from[node] = (None, cells)
+                heapq.heappush(open_set, (steps + heuristic(node), node))
+
+        while open_set:
+            f, node = heapq.heappop(open_set)
+            g = g_score[node]
+            if f - heuristic(node) > g:
+                continue  # Stale heap entry
+            if best is not None and f >= best[0]:
+                break
+            self.expanded += 1
+            if node in finish:
+                total = g + finish[node][0]
+                if best is None or total < best[0]:
+                    best = (total, self._trace(node, came_from) + finish[node][1])
+            for neighbor, length, edge in self.adjacent[node]:
+                tentative = g + length
+                if neighbor not in g_score or tentative < g_score[neighbor]:
+                    g_score[neighbor] = tentative
+                    a, b, cells = self.edges[edge]
+                    walk = (cells if self.nodes[node] == a and self.nodes[neighbor] == b
+                            else tuple(reversed(cells))) + (self.nodes[neighbor],)
+                    came_from[neighbor] = (node, walk)
+                    heapq.heappush(open_set, (tentative + heuristic(neighbor), neighbor))
+
+        if best is None:
+            return []
+        return [maze.cell_pos(cell) for cell in best[1]]
+
+    def _trace(self, node, came_from):
+        parts = []
+        while node is not None:
+            node, walk = came_from[node]
+            parts.append(walk)
+        cells = ()
+        for walk in reversed(parts):
+            cells += walk
+        return cells
+
+
+class PathCache:
+    """Bounded LRU of search results keyed by (algorithm, start, target, maze version).
+
+    Only for deterministic searches: the same query on the same walls always
+    returns the same path, so a hit is exactly what the search would have said.
+    Mazes with other walls have another version, so their paths never mix.
+    """
+
+    def __init__(self, size=PATH_CACHE_SIZE):
+        self.size = size
+        self.paths = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, algorithm, start, target, maze, search):
+        """Cached path for this query, or search(start, target) stored for next time"""
+        key = (algorithm, start, target, maze.version)
+        path = self.paths.get(key)
+        if path is None:
+            self.misses += 1
+            path = self.paths[key] = tuple(search(start, target))
+            if len(self.paths) > self.size:
+                self.paths.popitem(last=False)
+        else:
+            self.hits += 1
+            self.paths.move_to_end(key)
+        return list(path)  # Callers may edit their copy
+
+    def clear(self):
+        self.paths.clear()
+        self.hits = self.misses = 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate,
+                "entries": len(self.paths), "size": self.size}
+
+
+_compiled = {}
+
+
+def compile_maze(grid):
+    """Return the compiled Maze for grid's wall layout, building it only the first time"""
+    key = (len(grid[0]), bytes(1 if value == WALL else 0 for row in grid for value in row))
+    maze = _compiled.get(key)
+    if maze is None:
+        maze = _compiled[key] = Maze(grid)
+    return maze
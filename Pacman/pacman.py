@@ -1,18 +1,20 @@
 import pygame
-import random
-import heapq
 import math
-from collections import deque
 import platform
 import asyncio
+import os
+import time
+from collections import OrderedDict
+from maze import UP, DOWN, LEFT, RIGHT, DIRECTIONS
+from planner import BackgroundPlanner, LookaheadPlanner
+from profiler import FrameProfiler
+from simulation import GRID_WIDTH, GRID_HEIGHT, Difficulty, GameState, path_cache
 
 # Initialize Pygame
 pygame.init()
 
 # Game constants
 CELL_SIZE = 30
-GRID_WIDTH = 19
-GRID_HEIGHT = 21
 WIDTH = CELL_SIZE * GRID_WIDTH
 HEIGHT = CELL_SIZE * GRID_HEIGHT
 FPS = 5  # Increased for smoother animation
@@ -38,53 +40,49 @@ PEARL = (240, 234, 214)  # Pearl - for elegant highlights
 # Create the screen
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Pacman with Pathfinding")
-clock = pygame.time.Clock()
-
-# Game map
-game_map = [
-    [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
-    [1, 2, 2, 2, 2, 2, 2, 2, 2, 1, 2, 2, 2, 2, 2, 2, 2, 2, 1],
-    [1, 3, 1, 1, 2, 1, 1, 1, 2, 1, 2, 1, 1, 1, 2, 1, 1, 3, 1],
-    [1, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 1],
-    [1, 2, 1, 1, 2, 1, 2, 1, 1, 1, 1, 1, 2, 1, 2, 1, 1, 2, 1],
-    [1, 2, 2, 2, 2, 1, 2, 2, 2, 1, 2, 2, 2, 1, 2, 2, 2, 2, 1],
-    [1, 1, 1, 1, 2, 1, 1, 1, 0, 1, 0, 1, 1, 1, 2, 1, 1, 1, 1],
-    [0, 0, 0, 1, 2, 1, 0, 0, 0, 0, 0, 0, 0, 1, 2, 1, 0, 0, 0],
-    [1, 1, 1, 1, 2, 1, 0, 1, 1, 0, 1, 1, 0, 1, 2, 1, 1, 1, 1],
-    [0, 0, 0, 0, 2, 0, 0, 1, 0, 0, 0, 1, 0, 0, 2, 0, 0, 0, 0],
-    [1, 1, 1, 1, 2, 1, 0, 1, 1, 1, 1, 1, 0, 1, 2, 1, 1, 1, 1],
-    [0, 0, 0, 1, 2, 1, 0, 0, 0, 0, 0, 0, 0, 1, 2, 1, 0, 0, 0],
-    [1, 1, 1, 1, 2, 1, 0, 1, 1, 1, 1, 1, 0, 1, 2, 1, 1, 1, 1],
-    [1, 2, 2, 2, 2, 2, 2, 2, 2, 1, 2, 2, 2, 2, 2, 2, 2, 2, 1],
-    [1, 2, 1, 1, 2, 1, 1, 1, 2, 1, 2, 1, 1, 1, 2, 1, 1, 2, 1],
-    [1, 3, 2, 1, 2, 2, 2, 2, 2, 0, 2, 2, 2, 2, 2, 1, 2, 3, 1],
-    [1, 1, 2, 1, 2, 1, 2, 1, 1, 1, 1, 1, 2, 1, 2, 1, 2, 1, 1],
-    [1, 2, 2, 2, 2, 1, 2, 2, 2, 1, 2, 2, 2, 1, 2, 2, 2, 2, 1],
-    [1, 2, 1, 1, 1, 1, 1, 1, 2, 1, 2, 1, 1, 1, 1, 1, 1, 2, 1],
-    [1, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 1],
-    [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
-]
 
-# Directions
-UP = (0, -1)
-DOWN = (0, 1)
-LEFT = (-1, 0)
-RIGHT = (1, 0)
-DIRECTIONS = [UP, DOWN, LEFT, RIGHT]
+TEXT_CACHE_SIZE = 256  # Rendered labels kept; the HUD only adds one when a value changes
+
+class TextCache:
+    """Fonts kept per size and rendered text kept per (text, size, color), least recently used first out"""
+
+    def __init__(self, max_size=TEXT_CACHE_SIZE):
+        self.max_size = max_size
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+
+    def font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.Font(None, size)
+        return font
+
+    def render(self, text, size, color):
+        key = (text, size, color)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.surfaces[key] = self.font(size).render(text, True, color)
+            if len(self.surfaces) > self.max_size:
+                self.surfaces.popitem(last=False)
+        else:
+            self.surfaces.move_to_end(key)
+        return surface
+
+texts = TextCache()
 
-# Difficulty settings
-class Difficulty:
-    EASY = {"fps": 10, "ghost_update_freq": 10}
-    MEDIUM = {"fps": 15, "ghost_update_freq": 7}
-    HARD = {"fps": 20, "ghost_update_freq": 5}
+# Ghost line-up for the game window as (x, y, color, algorithm)
+GHOSTS = [
+    (9, 9, RED, "astar"),
+    (8, 9, PINK, "bfs"),
+    (10, 9, CYAN, "dfs"),
+    (9, 8, ORANGE, "random")
+]
 
 async def difficulty_screen():
     screen.fill(BLACK)
-    font = pygame.font.Font(None, 74)
-    title = font.render("Select Difficulty", True, YELLOW)
+    title = texts.render("Select Difficulty", 74, YELLOW)
     screen.blit(title, (WIDTH // 2 - title.get_width() // 2, HEIGHT // 4))
 
-    font = pygame.font.Font(None, 50)
     options = [
         ("Easy", Difficulty.EASY),
         ("Medium", Difficulty.MEDIUM),
@@ -95,7 +93,7 @@ async def difficulty_screen():
     option_rects = []
 
     for i, (text, _) in enumerate(options):
-        rendered = font.render(text, True, WHITE)
+        rendered = texts.render(text, 50, WHITE)
         rect = rendered.get_rect(center=(WIDTH // 2, HEIGHT // 2 + i * 60))
         option_rects.append((rect, text))
         screen.blit(rendered, rect)
@@ -123,571 +121,354 @@ async def difficulty_screen():
         screen.blit(title, (WIDTH // 2 - title.get_width() // 2, HEIGHT // 4))
         for i, (rect, text) in enumerate(option_rects):
             color = YELLOW if i == selected else WHITE
-            rendered = font.render(text, True, color)
+            rendered = texts.render(text, 50, color)
             screen.blit(rendered, rect)
 
         pygame.display.flip()
         await asyncio.sleep(0.01)  # Avoid blocking the main thread
 
-class Pacman:
+def cell_rect(x, y):
+    return pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
+
+def sprite_rect(x, y):
+    """Screen area a sprite centred on (x, y) may touch, including sprites that spill past their cell"""
+    return cell_rect(x, y).inflate(CELL_SIZE // 2, CELL_SIZE // 2)
+
+def render_pacman(surface, center_x, center_y, direction):
+    # Draw Pacman as a circle with a mouth
+    radius = CELL_SIZE // 2 - 2
+    
+    # Determine mouth angle based on direction
+    if direction == RIGHT:
+        start_angle = 30
+        end_angle = 330
+    elif direction == LEFT:
+        start_angle = 150
+        end_angle = 390
+    elif direction == UP:
+        start_angle = 240
+        end_angle = 480
+    else:
+        start_angle = 60
+        end_angle = 300
+    
+    pygame.draw.arc(surface, YELLOW, (center_x - radius, center_y - radius, 
+                                      radius * 2, radius * 2), 
+                    math.radians(start_angle), math.radians(end_angle), radius)
+    
+    # Draw a line from the center to complete the shape
+    end_x = center_x + radius * math.cos(math.radians(start_angle))
+    end_y = center_y - radius * math.sin(math.radians(start_angle))
+    pygame.draw.line(surface, YELLOW, (center_x, center_y), (end_x, end_y), 1)
+    
+    end_x = center_x + radius * math.cos(math.radians(end_angle))
+    end_y = center_y - radius * math.sin(math.radians(end_angle))
+    pygame.draw.line(surface, YELLOW, (center_x, center_y), (end_x, end_y), 1)
+
+def render_ghost(surface, center_x, center_y, color, direction):
+    radius = CELL_SIZE // 2 - 2
+    pygame.draw.circle(surface, color, (center_x, center_y), radius)
+    pygame.draw.rect(surface, color, (center_x - radius, center_y, radius * 2, radius))
+    wave_height = radius // 3
+    for i in range(3):
+        offset = i * (radius * 2) // 3
+        pygame.draw.rect(surface, color, (center_x - radius + offset, center_y + radius, (radius * 2) // 3, wave_height))
+    eye_radius = radius // 3
+    eye_offset = radius // 2
+    pygame.draw.circle(surface, WHITE, (center_x - eye_offset, center_y - eye_offset // 2), eye_radius)
+    pygame.draw.circle(surface, WHITE, (center_x + eye_offset, center_y - eye_offset // 2), eye_radius)
+    pupil_radius = eye_radius // 2
+    pupil_offset = eye_radius // 2
+    dx, dy = direction
+    pygame.draw.circle(surface, BLACK, (center_x - eye_offset + dx * pupil_offset, center_y - eye_offset // 2 + dy * pupil_offset), pupil_radius)
+    pygame.draw.circle(surface, BLACK, (center_x + eye_offset + dx * pupil_offset, center_y - eye_offset // 2 + dy * pupil_offset), pupil_radius)
+
+def render_corpse(surface, center_x, center_y, glow_intensity):
+    # Create glowing red color
+    glow_red = int(255 * glow_intensity)
+    glow_color = (glow_red, 0, 0)
+    
+    # Draw outer glow
+    glow_radius = int(CELL_SIZE // 2 * (1 + glow_intensity * 0.3))  # Vary size with glow
+    pygame.draw.circle(surface, glow_color, (center_x, center_y), glow_radius)
+    
+    # Draw inner solid circle
+    pygame.draw.circle(surface, RED, (center_x, center_y), CELL_SIZE // 2)
+
+GLOW_PHASES = 32  # Brightness steps the corpse glow is pre-rendered at
+
+class SpriteAtlas:
+    """Pre-rendered sprite surfaces keyed by (entity, color, direction, scared, animation phase).
+
+    Drawing an entity is one blit of a cached surface instead of a run of arc,
+    circle and line calls.  Everything is rebuilt when CELL_SIZE changes.
+    """
+
     def __init__(self):
-        self.x = 9
-        self.y = 15
-        self.direction = LEFT
-        self.next_direction = LEFT
-        self.score = 0
-        self.lives = 3
-        self.power_mode = False
-        self.power_timer = 0
-        self.fps = 10  # Thêm thuộc tính fps mặc định
-        self.prev_x = self.x
-        self.prev_y = self.y
-        self.path = []  # Path for autoplay
-
-    def move(self):
-        # Store previous position before moving
-        self.prev_x, self.prev_y = self.x, self.y
-
-        next_x = self.x + self.next_direction[0]
-        next_y = self.y + self.next_direction[1]
-        
-        if 0 <= next_x < GRID_WIDTH and 0 <= next_y < GRID_HEIGHT and game_map[next_y][next_x] != 1:
-            self.direction = self.next_direction
-        
-        next_x = self.x + self.direction[0]
-        next_y = self.y + self.direction[1]
-        
-        if 0 <= next_x < GRID_WIDTH and 0 <= next_y < GRID_HEIGHT and game_map[next_y][next_x] != 1:
-            self.x = next_x
-            self.y = next_y
-            
-            # Collect dots
-            if game_map[self.y][self.x] == 2:
-                game_map[self.y][self.x] = 0
-                self.score += 10
-            
-            # Collect power pellets
-            elif game_map[self.y][self.x] == 3:
-                game_map[self.y][self.x] = 0
-                self.score += 50
-                self.power_mode = True
-                self.power_timer = self.fps * 10
-        
-        if self.power_mode:
-            self.power_timer -= 1
-            if self.power_timer <= 0:
-                self.power_mode = False
-
-    def astar(self, start, target):
-        def heuristic(a, b):
-            return abs(a[0] - b[0]) + abs(a[1] - b[1])
-        
-        open_set = []
-        heapq.heappush(open_set, (0, start))
-        came_from = {}
-        g_score = {start: 0}
-        f_score = {start: heuristic(start, target)}
-        open_set_hash = {start}
-        
-        while open_set:
-            current = heapq.heappop(open_set)[1]
-            open_set_hash.remove(current)
-            
-            if current == target:
-                path = []
-                while current in came_from:
-                    path.append(current)
-                    current = came_from[current]
-                path.reverse()
-                return path
-            
-            for dx, dy in DIRECTIONS:
-                neighbor = (current[0] + dx, current[1] + dy)
-                if (0 <= neighbor[0] < GRID_WIDTH and 0 <= neighbor[1] < GRID_HEIGHT and 
-                    game_map[neighbor[1]][neighbor[0]] != 1):
-                    tentative_g_score = g_score[current] + 1
-                    if neighbor not in g_score or tentative_g_score < g_score[neighbor]:
-                        came_from[neighbor] = current
-                        g_score[neighbor] = tentative_g_score
-                        f_score[neighbor] = tentative_g_score + heuristic(neighbor, target)
-                        if neighbor not in open_set_hash:
-                            heapq.heappush(open_set, (f_score[neighbor], neighbor))
-                            open_set_hash.add(neighbor)
-        
-        return []
-
-    def evaluate_danger(self, ghosts):
-        """Heuristic to evaluate danger from ghosts"""
-        total_danger = 0
-        for ghost in ghosts:
-            if not ghost.eaten and not self.power_mode:  # Only consider active ghosts when not in power mode
-                distance = abs(self.x - ghost.x) + abs(self.y - ghost.y)
-                if distance < 3:  # Consider ghosts within 3 cells as highly dangerous
-                    total_danger += (3 - distance) * 2  # Higher penalty for closer ghosts
-        return total_danger
-
-    def find_nearest_food(self):
-        """Find the nearest dot or power pellet using A*"""
-        min_distance = float('inf')
-        nearest_food = None
-        for y in range(GRID_HEIGHT):
-            for x in range(GRID_WIDTH):
-                if game_map[y][x] in [2, 3]:  # Dot or power pellet
-                    path = self.astar((self.x, self.y), (x, y))
-                    if path and len(path) < min_distance:
-                        min_distance = len(path)
-                        nearest_food = (x, y)
-        return nearest_food
-
-    def find_nearest_ghost(self, ghosts):
-        """Find the nearest ghost using A*"""
-        min_distance = float('inf')
-        nearest_ghost_pos = None
-        for ghost in ghosts:
-            if not ghost.eaten:  # Only chase active ghosts
-                path = self.astar((self.x, self.y), (ghost.x, ghost.y))
-                if path and len(path) < min_distance:
-                    min_distance = len(path)
-                    nearest_ghost_pos = (ghost.x, ghost.y)
-        return nearest_ghost_pos
-
-    def choose_safe_direction(self, ghosts):
-        """Choose a direction that minimizes danger from ghosts"""
-        best_direction = self.direction
-        min_danger = float('inf')
-        for dx, dy in DIRECTIONS:
-            next_x, next_y = self.x + dx, self.y + dy
-            if 0 <= next_x < GRID_WIDTH and 0 <= next_y < GRID_HEIGHT and game_map[next_y][next_x] != 1:
-                # Temporarily move to evaluate danger
-                temp_x, temp_y = self.x, self.y
-                self.x, self.y = next_x, next_y
-                danger = self.evaluate_danger(ghosts)
-                self.x, self.y = temp_x, temp_y  # Revert position
-                if danger < min_danger:
-                    min_danger = danger
-                    best_direction = (dx, dy)
-        return best_direction
-
-    def autoplay_move(self, ghosts):
-        """Logic for autoplay: prioritize eating food to win, chase ghosts only when safe or necessary"""
-        # Check if there is any food left
-        has_food = any(2 in row or 3 in row for row in game_map)
-        
-        # Evaluate danger level
-        danger = self.evaluate_danger(ghosts)
-        
-        if has_food:
-            # Prioritize eating food unless danger is too high
-            if danger > 4:  # High danger threshold to trigger avoidance
-                self.next_direction = self.choose_safe_direction(ghosts)
-                self.path = []  # Clear path to prioritize avoiding
-            else:
-                target = self.find_nearest_food()
-                if target:
-                    self.path = self.astar((self.x, self.y), target)
-                    if self.path:
-                        next_pos = self.path[0]
-                        dx = next_pos[0] - self.x
-                        dy = next_pos[1] - self.y
-                        self.next_direction = (dx, dy)
-                        self.path.pop(0)
-                    else:
-                        self.next_direction = self.choose_safe_direction(ghosts)
-        else:
-            # No food left, prioritize chasing ghosts if in power mode or if safe
-            if self.power_mode or danger == 0:
-                target = self.find_nearest_ghost(ghosts)
-                if target:
-                    self.path = self.astar((self.x, self.y), target)
-                    if self.path:
-                        next_pos = self.path[0]
-                        dx = next_pos[0] - self.x
-                        dy = next_pos[1] - self.y
-                        self.next_direction = (dx, dy)
-                        self.path.pop(0)
-                    else:
-                        self.next_direction = self.choose_safe_direction(ghosts)
-            else:
-                # Avoid ghosts if not in power mode and no food left
-                self.next_direction = self.choose_safe_direction(ghosts)
-
-    def draw(self):
-        # Draw Pacman as a circle with a mouth
-        center_x = self.x * CELL_SIZE + CELL_SIZE // 2
-        center_y = self.y * CELL_SIZE + CELL_SIZE // 2
-        radius = CELL_SIZE // 2 - 2
-        
-        # Determine mouth angle based on direction
-        if self.direction == RIGHT:
-            start_angle = 30
-            end_angle = 330
-        elif self.direction == LEFT:
-            start_angle = 150
-            end_angle = 390
-        elif self.direction == UP:
-            start_angle = 240
-            end_angle = 480
-        else:
-            start_angle = 60
-            end_angle = 300
-        
-        pygame.draw.arc(screen, YELLOW, (center_x - radius, center_y - radius, 
-                                         radius * 2, radius * 2), 
-                        math.radians(start_angle), math.radians(end_angle), radius)
-        
-        # Draw a line from the center to complete the shape
-        end_x = center_x + radius * math.cos(math.radians(start_angle))
-        end_y = center_y - radius * math.sin(math.radians(start_angle))
-        pygame.draw.line(screen, YELLOW, (center_x, center_y), (end_x, end_y), 1)
-        
-        end_x = center_x + radius * math.cos(math.radians(end_angle))
-        end_y = center_y - radius * math.sin(math.radians(end_angle))
-        pygame.draw.line(screen, YELLOW, (center_x, center_y), (end_x, end_y), 1)
-
-class Ghost:
-    def __init__(self, x, y, color, algorithm, ghost_update_freq):
-        self.x = x
-        self.y = y
-        self.color = color
-        self.algorithm = algorithm
-        self.ghost_update_freq = ghost_update_freq
-        self.direction = random.choice(DIRECTIONS)
-        self.target_x = 0
-        self.target_y = 0
-        self.scared = False
-        self.path = []
-        self.update_counter = 0
-        self.eaten = False  # Flag to indicate if ghost is eaten
-        self.start_x = 9  # Fixed starting position at the center (9, 9)
-        self.start_y = 9
-        self.prev_x = self.x  # Track previous position for better collision detection
-        self.prev_y = self.y
-        self.has_corpse = False  # Flag to indicate if ghost has a corpse
-        self.respawn_timer = 0  # Timer for respawn
-        self.glow_timer = 0  # Timer for glow effect
-
-    def set_target(self, pacman):
-        if self.scared:
-            # Find the farthest possible position from Pacman
-            max_distance = -1
-            for y in range(GRID_HEIGHT):
-                for x in range(GRID_WIDTH):
-                    if game_map[y][x] != 1:  # Not a wall
-                        distance = abs(pacman.x - x) + abs(pacman.y - y)
-                        if distance > max_distance:
-                            max_distance = distance
-                            self.target_x, self.target_y = x, y
-        else:
-            self.target_x = pacman.x
-            self.target_y = pacman.y
-
-    def move(self, pacman):
-        # Store previous position before moving
-        self.prev_x, self.prev_y = self.x, self.y
-
-        # Update glow timer
-        if self.has_corpse:
-            self.glow_timer += 1
-
-        # Update respawn logic
-        if self.eaten:
-            self.respawn_timer += 1
-            if self.respawn_timer >= pacman.fps * 3:  # Respawn after 3 seconds
-                self.eaten = False
-                self.has_corpse = False
-                self.respawn_timer = 0
-                self.glow_timer = 0
-            return  # Don't move while eaten
-
-        # Only move if ghost is not eaten
-        self.update_counter += 1
-        
-        if self.update_counter >= self.ghost_update_freq:
-            self.update_counter = 0
-            self.set_target(pacman)
-            
-            if self.algorithm == "bfs":
-                self.path = self.bfs((self.x, self.y), (self.target_x, self.target_y))
-            elif self.algorithm == "dfs":
-                self.path = self.dfs((self.x, self.y), (self.target_x, self.target_y))
-            elif self.algorithm == "astar":
-                self.path = self.astar((self.x, self.y), (self.target_x, self.target_y))
-            else:
-                self.path = []
-        
-        if self.path:
-            next_pos = self.path.pop(0)
-            self.x, self.y = next_pos
+        self.cell_size = None
+        self.sprites = {}
+
+    def build(self, ghost_colors):
+        """Render every sprite the game can show for the given ghost colors"""
+        self.cell_size = CELL_SIZE
+        self.sprites.clear()
+        for direction in DIRECTIONS:
+            self.get(("pacman", YELLOW, direction, False, 0))
+            self.get(("ghost", BLUE, direction, True, 0))
+            for color in ghost_colors:
+                self.get(("ghost", color, direction, False, 0))
+        for phase in range(GLOW_PHASES):
+            self.get(("corpse", RED, None, False, phase))
+
+    def get(self, key):
+        if self.cell_size != CELL_SIZE:
+            self.cell_size = CELL_SIZE
+            self.sprites.clear()
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.sprites[key] = self._render(key)
+        return sprite
+
+    def _render(self, key):
+        entity, color, direction, scared, phase = key
+        size = sprite_rect(0, 0).size
+        surface = pygame.Surface(size, pygame.SRCALPHA)
+        center = (size[0] // 2, size[1] // 2)
+        if entity == "pacman":
+            render_pacman(surface, *center, direction)
+        elif entity == "ghost":
+            render_ghost(surface, *center, color, direction)
         else:
-            possible_moves = []
-            for dx, dy in DIRECTIONS:
-                next_x, next_y = self.x + dx, self.y + dy
-                if 0 <= next_x < GRID_WIDTH and 0 <= next_y < GRID_HEIGHT and game_map[next_y][next_x] != 1:
-                    possible_moves.append((dx, dy))
-            
-            if possible_moves:
-                self.direction = random.choice(possible_moves)
-                self.x += self.direction[0]
-                self.y += self.direction[1]
-
-    def bfs(self, start, target):
-        queue = deque([(start, [])])
-        visited = set([start])
-        
-        while queue:
-            (x, y), path = queue.popleft()
-            
-            if (x, y) == target:
-                return path + [(x, y)]
-            
-            for dx, dy in DIRECTIONS:
-                nx, ny = x + dx, y + dy
-                if (0 <= nx < GRID_WIDTH and 0 <= ny < GRID_HEIGHT and 
-                    game_map[ny][nx] != 1 and (nx, ny) not in visited):
-                    queue.append(((nx, ny), path + [(x, y)]))
-                    visited.add((nx, ny))
-        
-        return []
+            render_corpse(surface, *center, phase / (GLOW_PHASES - 1))
+        return surface.convert_alpha()
 
-    def dfs(self, start, target):
-        stack = [(start, [])]
-        visited = set([start])
-        
-        while stack:
-            (x, y), path = stack.pop()
-            
-            if (x, y) == target:
-                return path + [(x, y)]
-            
-            for dx, dy in DIRECTIONS:
-                nx, ny = x + dx, y + dy
-                if (0 <= nx < GRID_WIDTH and 0 <= ny < GRID_HEIGHT and 
-                    game_map[ny][nx] != 1 and (nx, ny) not in visited):
-                    stack.append(((nx, ny), path + [(x, y)]))
-                    visited.add((nx, ny))
-        
-        return []
+    def blit(self, key, x, y):
+        """Draw the sprite for key centred on cell (x, y) and return the area it covers"""
+        rect = sprite_rect(x, y)
+        screen.blit(self.get(key), rect)
+        return rect
 
-    def astar(self, start, target):
-        def heuristic(a, b):
-            return abs(a[0] - b[0]) + abs(a[1] - b[1])
-        
-        open_set = []
-        heapq.heappush(open_set, (0, start))
-        came_from = {}
-        g_score = {start: 0}
-        f_score = {start: heuristic(start, target)}
-        open_set_hash = {start}
-        
-        while open_set:
-            current = heapq.heappop(open_set)[1]
-            open_set_hash.remove(current)
-            
-            if current == target:
-                path = []
-                while current in came_from:
-                    path.append(current)
-                    current = came_from[current]
-                path.reverse()
-                return path
-            
-            for dx, dy in DIRECTIONS:
-                neighbor = (current[0] + dx, current[1] + dy)
-                if (0 <= neighbor[0] < GRID_WIDTH and 0 <= neighbor[1] < GRID_HEIGHT and 
-                    game_map[neighbor[1]][neighbor[0]] != 1):
-                    tentative_g_score = g_score[current] + 1
-                    if neighbor not in g_score or tentative_g_score < g_score[neighbor]:
-                        came_from[neighbor] = current
-                        g_score[neighbor] = tentative_g_score
-                        f_score[neighbor] = tentative_g_score + heuristic(neighbor, target)
-                        if neighbor not in open_set_hash:
-                            heapq.heappush(open_set, (f_score[neighbor], neighbor))
-                            open_set_hash.add(neighbor)
-        
-        return []
-
-    def draw(self):
-        # Only draw ghost if it's not eaten
-        if not self.eaten:
-            center_x = self.x * CELL_SIZE + CELL_SIZE // 2
-            center_y = self.y * CELL_SIZE + CELL_SIZE // 2
-            radius = CELL_SIZE // 2 - 2
-            
-            if self.scared:
-                color = BLUE
-            else:
-                color = self.color
-                
-            pygame.draw.circle(screen, color, (center_x, center_y), radius)
-            pygame.draw.rect(screen, color, (center_x - radius, center_y, radius * 2, radius))
-            wave_height = radius // 3
-            for i in range(3):
-                offset = i * (radius * 2) // 3
-                pygame.draw.rect(screen, color, (center_x - radius + offset, center_y + radius, (radius * 2) // 3, wave_height))
-            eye_radius = radius // 3
-            eye_offset = radius // 2
-            pygame.draw.circle(screen, WHITE, (center_x - eye_offset, center_y - eye_offset // 2), eye_radius)
-            pygame.draw.circle(screen, WHITE, (center_x + eye_offset, center_y - eye_offset // 2), eye_radius)
-            pupil_radius = eye_radius // 2
-            pupil_offset = eye_radius // 2
-            dx, dy = self.direction
-            pygame.draw.circle(screen, BLACK, (center_x - eye_offset + dx * pupil_offset, center_y - eye_offset // 2 + dy * pupil_offset), pupil_radius)
-            pygame.draw.circle(screen, BLACK, (center_x + eye_offset + dx * pupil_offset, center_y - eye_offset // 2 + dy * pupil_offset), pupil_radius)
-
-def draw_map():
+sprites = SpriteAtlas()
+
+def draw_pacman(pacman):
+    return sprites.blit(("pacman", YELLOW, pacman.direction, False, 0), pacman.x, pacman.y)
+
+def draw_ghost(ghost):
+    # Only draw ghost if it's not eaten
+    if not ghost.eaten:
+        if ghost.scared:
+            key = ("ghost", BLUE, ghost.direction, True, 0)
+        else:
+            key = ("ghost", ghost.color, ghost.direction, False, 0)
+        return sprites.blit(key, ghost.x, ghost.y)
+    return None
+
+def draw_corpse(ghost):
+    # Glow brightness follows a sine wave over the respawn wait
+    glow_intensity = (math.sin(ghost.glow_timer * 0.2) + 1) / 2  # Range from 0 to 1
+    phase = round(glow_intensity * (GLOW_PHASES - 1))
+    return sprites.blit(("corpse", RED, None, False, phase), ghost.start_x, ghost.start_y)
+
+def build_wall_layer(game_map):
+    """Render the walls and their decorations once onto an off-screen surface"""
+    surface = pygame.Surface((WIDTH, HEIGHT))
+    surface.fill(BLACK)
     for y in range(GRID_HEIGHT):
         for x in range(GRID_WIDTH):
             rect = pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
             if game_map[y][x] == 1:
                 # Draw main wall
-                pygame.draw.rect(screen, BLUE, rect)
+                pygame.draw.rect(surface, BLUE, rect)
                 
                 # Add cute brick pattern
                 brick_height = CELL_SIZE // 3
                 for i in range(3):
                     # Draw horizontal brick lines
                     offset = (i % 2) * (CELL_SIZE // 2)
-                    pygame.draw.line(screen, PASTEL_BLUE, 
+                    pygame.draw.line(surface, PASTEL_BLUE, 
                                    (x * CELL_SIZE + offset, y * CELL_SIZE + i * brick_height),
                                    (x * CELL_SIZE + CELL_SIZE - offset, y * CELL_SIZE + i * brick_height), 2)
                 
                 # Add cute corner decorations
                 if (x > 0 and game_map[y][x-1] == 1) and (y > 0 and game_map[y-1][x] == 1):
                     # Top-left corner
-                    pygame.draw.circle(screen, PASTEL_BLUE, (x * CELL_SIZE + 4, y * CELL_SIZE + 4), 3)
+                    pygame.draw.circle(surface, PASTEL_BLUE, (x * CELL_SIZE + 4, y * CELL_SIZE + 4), 3)
                 if (x < GRID_WIDTH-1 and game_map[y][x+1] == 1) and (y > 0 and game_map[y-1][x] == 1):
                     # Top-right corner
-                    pygame.draw.circle(screen, PASTEL_BLUE, (x * CELL_SIZE + CELL_SIZE - 4, y * CELL_SIZE + 4), 3)
+                    pygame.draw.circle(surface, PASTEL_BLUE, (x * CELL_SIZE + CELL_SIZE - 4, y * CELL_SIZE + 4), 3)
                 if (x > 0 and game_map[y][x-1] == 1) and (y < GRID_HEIGHT-1 and game_map[y+1][x] == 1):
                     # Bottom-left corner
-                    pygame.draw.circle(screen, PASTEL_BLUE, (x * CELL_SIZE + 4, y * CELL_SIZE + CELL_SIZE - 4), 3)
+                    pygame.draw.circle(surface, PASTEL_BLUE, (x * CELL_SIZE + 4, y * CELL_SIZE + CELL_SIZE - 4), 3)
                 if (x < GRID_WIDTH-1 and game_map[y][x+1] == 1) and (y < GRID_HEIGHT-1 and game_map[y+1][x] == 1):
                     # Bottom-right corner
-                    pygame.draw.circle(screen, PASTEL_BLUE, (x * CELL_SIZE + CELL_SIZE - 4, y * CELL_SIZE + CELL_SIZE - 4), 3)
+                    pygame.draw.circle(surface, PASTEL_BLUE, (x * CELL_SIZE + CELL_SIZE - 4, y * CELL_SIZE + CELL_SIZE - 4), 3)
                 
                 # Add cute dots in the middle of walls
                 if (x > 0 and game_map[y][x-1] == 1) and (x < GRID_WIDTH-1 and game_map[y][x+1] == 1):
                     # Horizontal wall
-                    pygame.draw.circle(screen, PASTEL_BLUE, (x * CELL_SIZE + CELL_SIZE//2, y * CELL_SIZE + CELL_SIZE//2), 2)
+                    pygame.draw.circle(surface, PASTEL_BLUE, (x * CELL_SIZE + CELL_SIZE//2, y * CELL_SIZE + CELL_SIZE//2), 2)
                 if (y > 0 and game_map[y-1][x] == 1) and (y < GRID_HEIGHT-1 and game_map[y+1][x] == 1):
                     # Vertical wall
-                    pygame.draw.circle(screen, PASTEL_BLUE, (x * CELL_SIZE + CELL_SIZE//2, y * CELL_SIZE + CELL_SIZE//2), 2)
+                    pygame.draw.circle(surface, PASTEL_BLUE, (x * CELL_SIZE + CELL_SIZE//2, y * CELL_SIZE + CELL_SIZE//2), 2)
                 
                 # Add cute patterns for T-junctions
                 if (x > 0 and game_map[y][x-1] == 1) and (x < GRID_WIDTH-1 and game_map[y][x+1] == 1) and (y > 0 and game_map[y-1][x] == 1):
                     # T-junction facing up
-                    pygame.draw.line(screen, PASTEL_BLUE, 
+                    pygame.draw.line(surface, PASTEL_BLUE, 
                                    (x * CELL_SIZE + CELL_SIZE//4, y * CELL_SIZE + CELL_SIZE//2),
                                    (x * CELL_SIZE + CELL_SIZE*3//4, y * CELL_SIZE + CELL_SIZE//2), 2)
                 if (x > 0 and game_map[y][x-1] == 1) and (x < GRID_WIDTH-1 and game_map[y][x+1] == 1) and (y < GRID_HEIGHT-1 and game_map[y+1][x] == 1):
                     # T-junction facing down
-                    pygame.draw.line(screen, PASTEL_BLUE, 
+                    pygame.draw.line(surface, PASTEL_BLUE, 
                                    (x * CELL_SIZE + CELL_SIZE//4, y * CELL_SIZE + CELL_SIZE//2),
                                    (x * CELL_SIZE + CELL_SIZE*3//4, y * CELL_SIZE + CELL_SIZE//2), 2)
                 if (y > 0 and game_map[y-1][x] == 1) and (y < GRID_HEIGHT-1 and game_map[y+1][x] == 1) and (x > 0 and game_map[y][x-1] == 1):
                     # T-junction facing left
-                    pygame.draw.line(screen, PASTEL_BLUE, 
+                    pygame.draw.line(surface, PASTEL_BLUE, 
                                    (x * CELL_SIZE + CELL_SIZE//2, y * CELL_SIZE + CELL_SIZE//4),
                                    (x * CELL_SIZE + CELL_SIZE//2, y * CELL_SIZE + CELL_SIZE*3//4), 2)
                 if (y > 0 and game_map[y-1][x] == 1) and (y < GRID_HEIGHT-1 and game_map[y+1][x] == 1) and (x < GRID_WIDTH-1 and game_map[y][x+1] == 1):
                     # T-junction facing right
-                    pygame.draw.line(screen, PASTEL_BLUE, 
+                    pygame.draw.line(surface, PASTEL_BLUE, 
                                    (x * CELL_SIZE + CELL_SIZE//2, y * CELL_SIZE + CELL_SIZE//4),
                                    (x * CELL_SIZE + CELL_SIZE//2, y * CELL_SIZE + CELL_SIZE*3//4), 2)
                 
-            elif game_map[y][x] == 2:
-                pygame.draw.circle(screen, PASTEL_GREEN, (x * CELL_SIZE + CELL_SIZE // 2, y * CELL_SIZE + CELL_SIZE // 2), CELL_SIZE // 6)
-            elif game_map[y][x] == 3:
-                pygame.draw.circle(screen, PURPLE, (x * CELL_SIZE + CELL_SIZE // 2, y * CELL_SIZE + CELL_SIZE // 2), CELL_SIZE // 4)
-
-def draw_score(pacman):
-    font = pygame.font.Font(None, 36)
-    score_text = font.render(f"Score: {pacman.score}", True, WHITE)
-    lives_text = font.render(f"Lives: {pacman.lives}", True, WHITE)
+    return surface
+
+def draw_pellet(surface, x, y, value):
+    if value == 2:
+        pygame.draw.circle(surface, PASTEL_GREEN, (x * CELL_SIZE + CELL_SIZE // 2, y * CELL_SIZE + CELL_SIZE // 2), CELL_SIZE // 6)
+    elif value == 3:
+        pygame.draw.circle(surface, PURPLE, (x * CELL_SIZE + CELL_SIZE // 2, y * CELL_SIZE + CELL_SIZE // 2), CELL_SIZE // 4)
+
+_wall_layers = {}  # (maze, cell size) -> pre-rendered wall surface
+
+class MapRenderer:
+    """Draws a game from a pre-rendered background and only pushes the changed areas to the display.
+
+    The walls are rendered once per layout, pellets once per game; after that a
+    frame erases last frame's sprites and any eaten pellets from the background,
+    draws the sprites, and updates just those rectangles instead of flipping.
+    """
+
+    def __init__(self, board):
+        self.board = board
+        key = (board.maze, CELL_SIZE)
+        if key not in _wall_layers:
+            rows = [board.cells[y * board.width:(y + 1) * board.width] for y in range(board.height)]
+            _wall_layers[key] = build_wall_layer(rows)
+        self.walls = _wall_layers[key]
+        self.background = self.walls.copy()
+        for y in range(board.height):
+            for x in range(board.width):
+                draw_pellet(self.background, x, y, board.cell(x, y))
+        self.eaten_seen = len(board.eaten)
+        self.dirty = []
+        self.previous_rects = []  # Sprite areas drawn last frame, erased at the start of this one
+        self.full_redraw = True
+
+    def begin_frame(self):
+        """Restore the background under last frame's sprites and under pellets eaten since then"""
+        self.dirty = []
+        for x, y in self.board.eaten[self.eaten_seen:]:
+            rect = cell_rect(x, y)
+            self.background.blit(self.walls, rect, rect)  # Wall decorations spill over cell edges, so copy rather than fill
+            self.dirty.append(rect)
+        self.eaten_seen = len(self.board.eaten)
+
+        if self.full_redraw:
+            screen.blit(self.background, (0, 0))
+        else:
+            for rect in self.previous_rects + self.dirty:
+                screen.blit(self.background, rect, rect)
+
+    def end_frame(self, sprite_rects):
+        """Push this frame to the display; sprite_rects are the areas drawn over the background"""
+        if self.full_redraw:
+            pygame.display.flip()
+            self.full_redraw = False
+        else:
+            pygame.display.update(self.previous_rects + self.dirty + sprite_rects)
+        self.previous_rects = sprite_rects
+
+# Fast-forward: number keys pick the simulation speed; None runs ticks back to back
+SPEED_KEYS = {pygame.K_1: 1, pygame.K_2: 2, pygame.K_3: 8, pygame.K_4: None}
+UNCAPPED_PACE = 8    # Uncapped games budget autoplay planning as if running at x8
+MAX_FRAME_TIME = 1.0 / 30  # Longest the loop simulates before it draws a frame
+INPUT_POLL_INTERVAL = 1.0 / 120  # Keys are sampled this often, independently of the tick rate
+
+# Profiling: phase timings of the game loop, shown with F3 and written out at the end of a game
+# when PACMAN_PROFILE names a .csv or .json file
+OVERLAY_REFRESH = 0.5
+OVERLAY_FONT_SIZE = 20
+OVERLAY_WIDTH = 300
+PROFILE_PATH = os.environ.get("PACMAN_PROFILE")
+profiler = FrameProfiler()
+profiler.watch("path_cache", path_cache.stats)
+
+HUD_RECT = pygame.Rect(0, 0, WIDTH, 40)  # Strip at the top of the screen the score line is drawn in
+
+def draw_score(pacman, speed=1):
+    score_text = texts.render(f"Score: {pacman.score}", 36, WHITE)
+    lives_text = texts.render(f"Lives: {pacman.lives}", 36, WHITE)
     screen.blit(score_text, (10, 10))
     screen.blit(lives_text, (WIDTH - 120, 10))
     
+    if speed != 1:
+        speed_text = texts.render(f"x{speed}" if speed else "Max", 36, YELLOW)
+        screen.blit(speed_text, (WIDTH - 130 - speed_text.get_width(), 10))
+    
     if pacman.power_mode:
         power_time = max(0, pacman.power_timer // pacman.fps)
-        power_text = font.render(f"Power: {power_time}s", True, WHITE)
+        power_text = texts.render(f"Power: {power_time}s", 36, WHITE)
         screen.blit(power_text, (WIDTH // 2 - power_text.get_width() // 2, 10))
+    return HUD_RECT
 
-def check_collision(pacman, ghosts):
-    for ghost in ghosts:
-        # Check if Pacman and ghost are in the same position
-        if pacman.x == ghost.x and pacman.y == ghost.y:
-            if pacman.power_mode and not ghost.eaten:
-                # Ghost is eaten, create corpse at spawn point
-                ghost.eaten = True
-                ghost.has_corpse = True
-                ghost.respawn_timer = 0  # Start respawn timer
-                ghost.x = ghost.start_x  # Move to spawn point
-                ghost.y = ghost.start_y
-                pacman.score += 200
-            elif not pacman.power_mode and not ghost.eaten:
-                # Pacman loses a life
-                pacman.lives -= 1
-                if pacman.lives > 0:
-                    pacman.x, pacman.y = 9, 15
-                    for g in ghosts:
-                        if not g.eaten:
-                            g.x, g.y = 9, 9
-                return True
-        # Additional check for crossing paths (Pacman and ghost swap positions)
-        elif (pacman.x == ghost.prev_x and pacman.y == ghost.prev_y and
-              pacman.prev_x == ghost.x and pacman.prev_y == ghost.y):
-            if pacman.power_mode and not ghost.eaten:
-                # Ghost is eaten, create corpse at spawn point
-                ghost.eaten = True
-                ghost.has_corpse = True
-                ghost.respawn_timer = 0  # Start respawn timer
-                ghost.x = ghost.start_x  # Move to spawn point
-                ghost.y = ghost.start_y
-                pacman.score += 200
-            elif not pacman.power_mode and not ghost.eaten:
-                # Pacman loses a life
-                pacman.lives -= 1
-                if pacman.lives > 0:
-                    pacman.x, pacman.y = 9, 15
-                    for g in ghosts:
-                        if not g.eaten:
-                            g.x, g.y = 9, 9
-                return True
-    return False
-
-def check_win():
-    for y in range(GRID_HEIGHT):
-        for x in range(GRID_WIDTH):
-            if game_map[y][x] in [2, 3]:
-                return False
-    return True
-
-def reset_game_map():
-    """Reset the game map to initial state"""
-    global game_map
-    game_map = [
-        [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
-        [1, 2, 2, 2, 2, 2, 2, 2, 2, 1, 2, 2, 2, 2, 2, 2, 2, 2, 1],
-        [1, 3, 1, 1, 2, 1, 1, 1, 2, 1, 2, 1, 1, 1, 2, 1, 1, 3, 1],
-        [1, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 1],
-        [1, 2, 1, 1, 2, 1, 2, 1, 1, 1, 1, 1, 2, 1, 2, 1, 1, 2, 1],
-        [1, 2, 2, 2, 2, 1, 2, 2, 2, 1, 2, 2, 2, 1, 2, 2, 2, 2, 1],
-        [1, 1, 1, 1, 2, 1, 1, 1, 0, 1, 0, 1, 1, 1, 2, 1, 1, 1, 1],
-        [0, 0, 0, 1, 2, 1, 0, 0, 0, 0, 0, 0, 0, 1, 2, 1, 0, 0, 0],
-        [1, 1, 1, 1, 2, 1, 0, 1, 1, 0, 1, 1, 0, 1, 2, 1, 1, 1, 1],
-        [0, 0, 0, 0, 2, 0, 0, 1, 0, 0, 0, 1, 0, 0, 2, 0, 0, 0, 0],
-        [1, 1, 1, 1, 2, 1, 0, 1, 1, 1, 1, 1, 0, 1, 2, 1, 1, 1, 1],
-        [0, 0, 0, 1, 2, 1, 0, 0, 0, 0, 0, 0, 0, 1, 2, 1, 0, 0, 0],
-        [1, 1, 1, 1, 2, 1, 0, 1, 1, 1, 1, 1, 0, 1, 2, 1, 1, 1, 1],
-        [1, 2, 2, 2, 2, 2, 2, 2, 2, 1, 2, 2, 2, 2, 2, 2, 2, 2, 1],
-        [1, 2, 1, 1, 2, 1, 1, 1, 2, 1, 2, 1, 1, 1, 2, 1, 1, 2, 1],
-        [1, 3, 2, 1, 2, 2, 2, 2, 2, 0, 2, 2, 2, 2, 2, 1, 2, 3, 1],
-        [1, 1, 2, 1, 2, 1, 2, 1, 1, 1, 1, 1, 2, 1, 2, 1, 2, 1, 1],
-        [1, 2, 2, 2, 2, 1, 2, 2, 2, 1, 2, 2, 2, 1, 2, 2, 2, 2, 1],
-        [1, 2, 1, 1, 1, 1, 1, 1, 2, 1, 2, 1, 1, 1, 1, 1, 1, 2, 1],
-        [1, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 1],
-        [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
-    ]
+class ProfileOverlay:
+    """Table of per-phase frame timings drawn over the maze; F3 shows or hides it.
+
+    The table is re-rendered a few times a second rather than every frame, so
+    the overlay itself barely shows up in the numbers it reports.
+    """
+
+    def __init__(self):
+        self.visible = False
+        self.surface = None
+        self.updated = 0.0
+
+    def draw(self, profiler):
+        now = time.perf_counter()
+        if self.surface is None or now - self.updated >= OVERLAY_REFRESH:
+            self.surface = self.render(profiler.stats(), profiler.counters())
+            self.updated = now
+        return screen.blit(self.surface, (8, HEIGHT - self.surface.get_height() - 8))
+
+    def render(self, stats, counters):
+        font = texts.font(OVERLAY_FONT_SIZE)
+        rows = [("phase ms", "p50", "p95", "p99")]
+        rows += [(name, f"{row['p50_ms']:.2f}", f"{row['p95_ms']:.2f}", f"{row['p99_ms']:.2f}")
+                 for name, row in stats.items()]
+        if "plan.wait" in stats:
+            # Autoplay plans that missed their frame, out of the plans picked up in the window
+            plans = stats["plan.wait"]["count"]
+            misses = stats["plan.miss"]["count"] if "plan.miss" in stats else 0
+            rows.append(("plan misses", str(misses), str(plans), f"{misses / plans:.1%}"))
+        if "path_cache" in counters:
+            cache = counters["path_cache"]
+            rows.append(("path cache", str(cache["hits"]), str(cache["misses"]), f"{cache['hit_rate']:.1%}"))
+        line_height = font.get_linesize()
+        surface = pygame.Surface((OVERLAY_WIDTH, line_height * len(rows) + 8), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 190))
+        for i, row in enumerate(rows):
+            y = 4 + i * line_height
+            surface.blit(font.render(row[0], True, WHITE), (6, y))
+            for column, value in enumerate(row[1:]):
+                text = font.render(value, True, WHITE)
+                right = OVERLAY_WIDTH - 6 - (2 - column) * 60  # Numbers right-aligned in 60px columns
+                surface.blit(text, (right - text.get_width(), y))
+        return surface
+
+overlay = ProfileOverlay()
 
 async def game_over_screen():
     """Game over screen with options to restart or return to menu"""
@@ -698,21 +479,18 @@ async def game_over_screen():
         screen.fill(BLACK)
         
         # Game Over title
-        font = pygame.font.Font(None, 74)
-        text = font.render("GAME OVER!", True, RED)
+        text = texts.render("GAME OVER!", 74, RED)
         screen.blit(text, (WIDTH // 2 - text.get_width() // 2, HEIGHT // 3))
         
         # Options
-        font = pygame.font.Font(None, 48)
         for i, option in enumerate(options):
             color = YELLOW if i == selected else WHITE
-            option_text = font.render(option, True, color)
+            option_text = texts.render(option, 48, color)
             y_pos = HEIGHT // 2 + i * 60
             screen.blit(option_text, (WIDTH // 2 - option_text.get_width() // 2, y_pos))
         
         # Instructions
-        font = pygame.font.Font(None, 36)
-        instruction = font.render("Use arrow keys and Enter to select", True, WHITE)
+        instruction = texts.render("Use arrow keys and Enter to select", 36, WHITE)
         screen.blit(instruction, (WIDTH // 2 - instruction.get_width() // 2, HEIGHT - 80))
         
         pygame.display.flip()
@@ -735,6 +513,41 @@ async def game_over_screen():
         
         await asyncio.sleep(0.016)
 
+_menu_backgrounds = {}  # (builder, width, height) -> pre-rendered static menu art
+
+def menu_background(builder):
+    """Static art for a menu screen, rendered by builder the first time and reused every frame after"""
+    key = (builder, WIDTH, HEIGHT)
+    background = _menu_backgrounds.get(key)
+    if background is None:
+        background = pygame.Surface((WIDTH, HEIGHT))
+        builder(background)
+        background = _menu_backgrounds[key] = background.convert()
+    return background
+
+def build_start_background(surface):
+    # Blue gradient background
+    for y in range(HEIGHT):
+        blue_intensity = int(25 + (y / HEIGHT) * 100)
+        color = (0, 0, blue_intensity + 100)
+        pygame.draw.line(surface, color, (0, y), (WIDTH, y))
+    
+    # Instructions
+    instruction = texts.render("Arrow Keys: Move | Enter: Select | ESC: Exit", 32, WHITE)
+    surface.blit(instruction, (WIDTH // 2 - instruction.get_width() // 2, HEIGHT - 100))
+    
+    # Dots in front of the Pacman preview
+    for i in range(5):
+        dot_x = WIDTH // 4 + 40 + i * 20
+        pygame.draw.circle(surface, PASTEL_BLUE, (dot_x, HEIGHT - 150), 3)
+
+def build_win_background(surface):
+    # Celebration background
+    for y in range(HEIGHT):
+        color_intensity = int(30 + (y / HEIGHT) * 50)
+        color = (color_intensity, color_intensity // 2, 0)
+        pygame.draw.line(surface, color, (0, y), (WIDTH, y))
+
 async def start_screen():
     """Start screen with beautiful effects and mode selection"""
     selected = 0
@@ -769,35 +582,24 @@ async def start_screen():
         time_counter += 1
         title_bounce = math.sin(time_counter * 0.1) * 5
         
-        # Blue gradient background
-        for y in range(HEIGHT):
-            blue_intensity = int(25 + (y / HEIGHT) * 100)
-            color = (0, 0, blue_intensity + 100)
-            pygame.draw.line(screen, color, (0, y), (WIDTH, y))
+        # Static art (gradient, instructions, dots) comes pre-rendered; only animated parts are drawn below
+        screen.blit(menu_background(build_start_background), (0, 0))
         
         # Title
-        font = pygame.font.Font(None, 84)
-        title = font.render("PACMAN AI", True, YELLOW)
+        title = texts.render("PACMAN AI", 84, YELLOW)
         title_y = HEIGHT // 4 + title_bounce
         screen.blit(title, (WIDTH // 2 - title.get_width() // 2, title_y))
         
         # Subtitle
-        font = pygame.font.Font(None, 36)
-        subtitle = font.render("Artificial Intelligence - Pathfinding Algorithms", True, PASTEL_BLUE)
+        subtitle = texts.render("Artificial Intelligence - Pathfinding Algorithms", 36, PASTEL_BLUE)
         screen.blit(subtitle, (WIDTH // 2 - subtitle.get_width() // 2, title_y + 80))
         
         # Menu options
-        font = pygame.font.Font(None, 48)
         for i, option in enumerate(options):
             color = YELLOW if i == selected else PASTEL_BLUE
-            option_text = font.render(option, True, color)
+            option_text = texts.render(option, 48, color)
             screen.blit(option_text, (WIDTH // 2 - option_text.get_width() // 2, HEIGHT // 2 + i * 60))
         
-        # Instructions
-        font = pygame.font.Font(None, 32)
-        instruction = font.render("Arrow Keys: Move | Enter: Select | ESC: Exit", True, WHITE)
-        screen.blit(instruction, (WIDTH // 2 - instruction.get_width() // 2, HEIGHT - 100))
-        
         # Animated Pacman preview
         pacman_x = WIDTH // 4
         pacman_y = HEIGHT - 150
@@ -809,11 +611,6 @@ async def start_screen():
                         pacman_radius * 2, pacman_radius * 2),
                        math.radians(mouth_angle), math.radians(360 - mouth_angle), pacman_radius)
         
-        # Animated dots
-        for i in range(5):
-            dot_x = pacman_x + 40 + i * 20
-            pygame.draw.circle(screen, PASTEL_BLUE, (dot_x, pacman_y), 3)
-        
         # Ghost preview
         ghost_colors = [RED, PINK, CYAN, ORANGE]
         for i, color in enumerate(ghost_colors):
@@ -834,11 +631,8 @@ async def win_screen():
     while True:
         time_counter += 1
         
-        # Celebration background
-        for y in range(HEIGHT):
-            color_intensity = int(30 + (y / HEIGHT) * 50)
-            color = (color_intensity, color_intensity // 2, 0)
-            pygame.draw.line(screen, color, (0, y), (WIDTH, y))
+        # Celebration background, pre-rendered once
+        screen.blit(menu_background(build_win_background), (0, 0))
         
         # Animated confetti
         for i in range(20):
@@ -848,25 +642,22 @@ async def win_screen():
             pygame.draw.circle(screen, color, (x, y), 3)
         
         # Victory title
-        font = pygame.font.Font(None, 84)
         title_bounce = math.sin(time_counter * 0.1) * 8
-        text = font.render("VICTORY!", True, YELLOW)
+        text = texts.render("VICTORY!", 84, YELLOW)
         screen.blit(text, (WIDTH // 2 - text.get_width() // 2, HEIGHT // 3 + title_bounce))
         
         # Options
-        font = pygame.font.Font(None, 48)
         for i, option in enumerate(options):
             color = YELLOW if i == selected else WHITE
             if i == selected:
-                glow_text = font.render(option, True, (255, 255, 150))
+                glow_text = texts.render(option, 48, (255, 255, 150))
                 screen.blit(glow_text, (WIDTH // 2 - glow_text.get_width() // 2 + 2, HEIGHT // 2 + i * 60 + 2))
             
-            option_text = font.render(option, True, color)
+            option_text = texts.render(option, 48, color)
             screen.blit(option_text, (WIDTH // 2 - option_text.get_width() // 2, HEIGHT // 2 + i * 60))
         
         # Instructions
-        font = pygame.font.Font(None, 36)
-        instruction = font.render("Use arrow keys and Enter to select", True, WHITE)
+        instruction = texts.render("Use arrow keys and Enter to select", 36, WHITE)
         screen.blit(instruction, (WIDTH // 2 - instruction.get_width() // 2, HEIGHT - 80))
         
         pygame.display.flip()
@@ -881,10 +672,8 @@ async def win_screen():
                     selected = (selected + 1) % len(options)
                 elif event.key == pygame.K_RETURN:
                     if selected == 0:  # Play Again
-                        reset_game_map()  # Reset map before restarting
                         return "restart"
                     elif selected == 1:  # Return to Menu
-                        reset_game_map()  # Reset map before returning to menu
                         return "menu"
                     else:  # Exit
                         return "quit"
@@ -893,93 +682,107 @@ async def win_screen():
 
 async def game_loop(difficulty, autoplay=False):
     """Main game loop with autoplay option"""
-    pacman = Pacman()
-    pacman.fps = difficulty["fps"]
-    ghosts = [
-        Ghost(9, 9, RED, "astar", difficulty["ghost_update_freq"]),
-        Ghost(8, 9, PINK, "bfs", difficulty["ghost_update_freq"]),
-        Ghost(10, 9, CYAN, "dfs", difficulty["ghost_update_freq"]),
-        Ghost(9, 8, ORANGE, "random", difficulty["ghost_update_freq"])
-    ]
+    # Autoplay searches on a worker thread while the previous frame is drawn
+    planner = BackgroundPlanner(LookaheadPlanner()) if autoplay else None
+    state = GameState(difficulty, autoplay, ghosts=GHOSTS, planner=planner)  # Every game starts on a fresh board
+    pacman = state.pacman
+    ghosts = state.ghosts
+    state.profiler = profiler
+    if planner:
+        planner.profiler = profiler
+    renderer = MapRenderer(state.board)
+    if sprites.cell_size != CELL_SIZE:
+        sprites.build([color for _, _, color, _ in GHOSTS])
     
+    # Fixed-timestep simulation: ticks run at the difficulty's rate (times the fast-forward
+    # speed) however often frames are drawn, and only the latest state is rendered
+    tick_time = 1.0 / difficulty["fps"]
+    speed = 1
+    accumulator = 0.0
+    previous = time.perf_counter()
     running = True
-    game_over = False
-    win = False
     
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                return "quit"
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    return "menu"  # Return to menu
-                if not autoplay:  # Manual mode: handle player input
-                    if event.key == pygame.K_UP:
-                        pacman.next_direction = UP
-                    elif event.key == pygame.K_DOWN:
-                        pacman.next_direction = DOWN
-                    elif event.key == pygame.K_LEFT:
-                        pacman.next_direction = LEFT
-                    elif event.key == pygame.K_RIGHT:
-                        pacman.next_direction = RIGHT
-        
-        if not game_over and not win:
-            screen.fill(BLACK)
-            
-            # Autoplay logic
-            if autoplay:
-                pacman.autoplay_move(ghosts)
-            
-            pacman.move()
-            for ghost in ghosts:
-                ghost.scared = pacman.power_mode
-                ghost.move(pacman)
-            
-            if check_collision(pacman, ghosts):
-                if pacman.lives <= 0:
-                    game_over = True
-            
-            if check_win():
-                win = True
-            
-            draw_map()
-            # Draw ghost corpses (red dots) at spawn points with glow effect
-            for ghost in ghosts:
-                if ghost.has_corpse:
-                    # Calculate glow intensity using sine wave
-                    glow_intensity = (math.sin(ghost.glow_timer * 0.2) + 1) / 2  # Range from 0 to 1
-                    # Create glowing red color
-                    glow_red = int(255 * glow_intensity)
-                    glow_color = (glow_red, 0, 0)
-                    
-                    # Draw outer glow
-                    glow_radius = int(CELL_SIZE // 2 * (1 + glow_intensity * 0.3))  # Vary size with glow
-                    pygame.draw.circle(screen, glow_color, 
-                                     (ghost.start_x * CELL_SIZE + CELL_SIZE // 2,
-                                      ghost.start_y * CELL_SIZE + CELL_SIZE // 2),
-                                     glow_radius)
+    try:
+        while running:
+            with profiler.phase("events"):
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        return "quit"
+                    elif event.type == pygame.KEYDOWN:
+                        if event.key == pygame.K_ESCAPE:
+                            return "menu"  # Return to menu
+                        if event.key == pygame.K_F3:
+                            overlay.visible = not overlay.visible
+                        if event.key in SPEED_KEYS:
+                            speed = SPEED_KEYS[event.key]
+                            if planner:
+                                planner.pace(difficulty["fps"] * (speed or UNCAPPED_PACE))
+                        if not autoplay:  # Manual mode: buffer player input until the next tick
+                            if event.key == pygame.K_UP:
+                                pacman.intents.push(UP)
+                            elif event.key == pygame.K_DOWN:
+                                pacman.intents.push(DOWN)
+                            elif event.key == pygame.K_LEFT:
+                                pacman.intents.push(LEFT)
+                            elif event.key == pygame.K_RIGHT:
+                                pacman.intents.push(RIGHT)
+        
+            if not state.finished:
+                now = time.perf_counter()
+                accumulator += (now - previous) * (speed or 0)
+                previous = now
+                
+                # Run every tick that is due (all of them while uncapped), but give up after a
+                # frame's worth of work and drop the backlog rather than fall further behind
+                steps = 0
+                while not state.finished and (speed is None or accumulator >= tick_time):
+                    with profiler.phase("tick"):
+                        state.step()
+                        if planner:
+                            planner.submit(state)  # Plan the next tick while this one is drawn
+                    accumulator -= tick_time
+                    steps += 1
+                    if time.perf_counter() - now >= MAX_FRAME_TIME:
+                        accumulator = min(max(accumulator, 0.0), tick_time)
+                        break
+                
+                if steps or renderer.full_redraw:
+                    with profiler.phase("draw_map"):
+                        renderer.begin_frame()
+                    with profiler.phase("sprites"):
+                        sprite_rects = []
+                        # Draw ghost corpses (red dots) at spawn points with glow effect
+                        for ghost in ghosts:
+                            if ghost.has_corpse:
+                                sprite_rects.append(draw_corpse(ghost))
                     
-                    # Draw inner solid circle
-                    pygame.draw.circle(screen, RED, 
-                                     (ghost.start_x * CELL_SIZE + CELL_SIZE // 2,
-                                      ghost.start_y * CELL_SIZE + CELL_SIZE // 2),
-                                     CELL_SIZE // 2)
-            
-            pacman.draw()
-            # Only draw ghosts that are not eaten
-            for ghost in ghosts:
-                if not ghost.eaten:
-                    ghost.draw()
-            draw_score(pacman)
-            pygame.display.flip()
-            clock.tick(difficulty["fps"])
-            await asyncio.sleep(1.0 / difficulty["fps"])
-        elif game_over:
-            result = await game_over_screen()
-            return result
-        elif win:
-            result = await win_screen()
-            return result
+                        sprite_rects.append(draw_pacman(pacman))
+                        # Only draw ghosts that are not eaten
+                        for ghost in ghosts:
+                            if not ghost.eaten:
+                                sprite_rects.append(draw_ghost(ghost))
+                        sprite_rects.append(draw_score(pacman, speed))
+                        if overlay.visible:
+                            sprite_rects.append(overlay.draw(profiler))
+                    with profiler.phase("display"):
+                        renderer.end_frame(sprite_rects)
+                
+                # Sleep until the next tick is due, waking up often enough to sample input in between
+                if speed is None:
+                    await asyncio.sleep(0)
+                else:
+                    await asyncio.sleep(min(max(0.0, (tick_time - accumulator) / speed), INPUT_POLL_INTERVAL))
+            elif state.game_over:
+                result = await game_over_screen()
+                return result
+            elif state.win:
+                result = await win_screen()
+                return result
+    finally:
+        if planner:
+            planner.close()
+        if PROFILE_PATH:
+            profiler.export(PROFILE_PATH)
 
 async def main():
     """Main function with menu loop"""
@@ -995,9 +798,6 @@ async def main():
             if difficulty is None:
                 break
             
-            # Reset game map before starting new game
-            reset_game_map()
-            
             # Game loop with restart/menu options
             while True:
                 result = await game_loop(difficulty, autoplay)
@@ -1006,11 +806,9 @@ async def main():
                     pygame.quit()
                     return
                 elif result == "menu":
-                    reset_game_map()  # Reset map before returning to menu
                     break  # Return to start screen
                 elif result == "restart":
-                    reset_game_map()  # Reset map before restarting
-                    continue  # Restart the game with same difficulty
+                    continue  # Restart the game with same difficulty (game_loop starts on a fresh board)
     
     except Exception as e:
         print(f"An error occurred: {e}")
@@ -0,0 +1,487 @@
+"""Lookahead autoplay: expectimax over a compact model of the game.
+
+Every tick the planner searches Pacman's moves to increasing depths (iterative
+deepening) until a time budget derived from the difficulty's fps runs out, and
+plays the best move of the deepest search that finished.  Headless runs that
+must be reproducible give it a node budget instead, so the search stops at the
+same place whatever the CPU load.  Ghosts are modelled
+the way simulation.Ghost behaves: they follow their current path, replan toward
+Pacman every ghost_update_freq ticks (away from him while scared) and wander at
+random when they have no path; random moves become chance nodes.  Results are
+kept in a transposition table keyed by a Zobrist hash of the positions, the
+pellets and the power timer, so repeated positions are searched once.
+
+    from planner import LookaheadPlanner
+    state = GameState(Difficulty.HARD, autoplay=True, planner=LookaheadPlanner())
+"""
+import itertools
+import platform
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+
+from maze import DIRECTIONS, NO_STEP, UNREACHABLE
+from simulation import POWER_PELLET
+
+BUDGET_SHARE = 0.35     # Share of one frame the search may use; the rest covers overrun, ghosts and drawing
+MAX_DEPTH = 10          # Deepest search, in ticks
+TABLE_SIZE = 1 << 16    # Transposition table entries kept before the least recently used are evicted
+WAIT_SHARE = 0.25       # Share of a frame the game waits for a background plan before reusing the last one
+CHECK_EVERY = 4         # Nodes searched between two looks at the clock
+NODE_BUDGET = 1000      # Nodes per tick for seeded headless runs, about what the clock allows on hard
+
+DISCOUNT = 0.95         # Rewards further ahead count for less, so Pacman does not put off eating
+DEATH = -2000.0
+WIN = 5000.0
+GHOST_EATEN = 200
+FOOD_WEIGHT = 2.0       # Leaf penalty per step to the nearest pellet
+DANGER_RADIUS = 4
+DANGER_WEIGHT = 40.0
+
+# Ghost modes besides "chasing target cell" (a cell id >= 0)
+ROUTE = -1   # Following the path the ghost had when the search started
+WANDER = -2  # No path: one random step per tick
+FLEE = -3    # Scared: stepping away from Pacman
+GONE = -4    # Eaten during the search
+
+UNKNOWN = 0xFFFF
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class TranspositionTable:
+    """Bounded map from Zobrist key to (depth, value, best move), evicting the least recently used"""
+
+    def __init__(self, size=TABLE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, depth, value, move):
+        self.entries[key] = (depth, value, move)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class Zobrist:
+    """Random 64-bit key per (feature, value), drawn from a seeded generator the first time it is needed"""
+
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+        self.keys = {}
+
+    def __call__(self, feature, value):
+        key = self.keys.get((feature, value))
+        if key is None:
+            key = self.keys[feature, value] = self.rng.getrandbits(64)
+        return key
+
+
+class GhostModel:
+    """What the search knows about one ghost at the root: its path and when it replans"""
+
+    def __init__(self, ghost, maze):
+        self.algorithm = ghost.algorithm
+        self.route = tuple(maze.cell_id(cell) for cell in ghost.path)
+        self.freq = ghost.ghost_update_freq
+        self.first_replan = (ghost.ghost_update_freq - 1 - ghost.update_counter) % ghost.ghost_update_freq
+
+    def replans(self, ply):
+        return ply >= self.first_replan and (ply - self.first_replan) % self.freq == 0
+
+
+class LookaheadPlanner:
+    """Time-budgeted expectimax autoplay; call it with a GameState to get Pacman's next direction.
+
+    Returns None when the maze is too big for distance tables, and GameState then
+    falls back to the greedy Pacman.autoplay_move.
+    """
+
+    def __init__(self, budget=None, max_depth=MAX_DEPTH, table_size=TABLE_SIZE, seed=0, node_budget=None):
+        self.budget = budget  # Seconds per tick; None means BUDGET_SHARE of a frame at the game's fps
+        self.node_budget = node_budget  # Nodes per tick instead of the clock; the same game then plays the same
+        self.max_depth = max_depth
+        self.table = TranspositionTable(table_size)
+        self.zobrist = Zobrist(seed)
+        self.board = None
+        self.eaten_seen = 0
+        self.pellet_key = 0
+        # Totals over every tick planned, for tuning the budget
+        self.ticks = 0
+        self.depth_total = 0
+        self.timeouts = 0
+        self.nodes = 0
+
+    def __call__(self, state):
+        maze = state.board.maze
+        if not maze.has_tables:
+            return None
+        if self.node_budget is not None:
+            self.deadline = None
+            self.node_limit = self.nodes + self.node_budget
+        else:
+            budget = self.budget if self.budget is not None else BUDGET_SHARE / state.difficulty["fps"]
+            self.deadline = time.perf_counter() + budget
+        self._prepare(state)
+
+        pac = maze.cell_id((state.pacman.x, state.pacman.y))
+        ghosts = self.root_ghosts
+        power = state.pacman.power_timer if state.pacman.power_mode else 0
+        best, depth_done = None, 0
+        for depth in range(1, self.max_depth + 1):
+            began, nodes_before = time.perf_counter(), self.nodes
+            try:
+                _, move = self._max(0, depth, pac, ghosts, state.board.pellets, state.board.food_left,
+                                    power, self.pellet_key)
+            except SearchTimeout:
+                self.timeouts += 1
+                break
+            best, depth_done = move, depth
+            # The next depth costs several times this one; do not start what cannot finish
+            if self.deadline is None:
+                if self.nodes + 3 * (self.nodes - nodes_before) > self.node_limit:
+                    break
+            else:
+                now = time.perf_counter()
+                if now + 3 * (now - began) > self.deadline:
+                    break
+        self.ticks += 1
+        self.depth_total += depth_done
+        if best is None:
+            return None
+        offset = best - pac
+        return DIRECTIONS[self.offsets.index(offset)]
+
+    def _spent(self):
+        if self.deadline is None:
+            return self.nodes >= self.node_limit
+        return time.perf_counter() > self.deadline
+
+    def _prepare(self, state):
+        """Per-tick root data: ghost models, pellet distances and the incremental pellet key"""
+        board, maze = state.board, state.board.maze
+        self.maze = maze
+        self.n = len(maze.walkable)
+        self.width = maze.width
+        self.offsets = [dy * maze.width + dx for dx, dy in DIRECTIONS]
+        self.values = board.template.cells
+        self.fps = state.pacman.fps
+        self.tick = state.tick
+
+        # Pellet key: XOR of the keys of every eaten cell, kept up to date from the board's eaten log
+        if board is not self.board or len(board.eaten) < self.eaten_seen:
+            self.board, self.eaten_seen, self.pellet_key = board, 0, 0
+            self.table.entries.clear()  # New game (or a rewind): stored ticks no longer line up
+        for x, y in board.eaten[self.eaten_seen:]:
+            self.pellet_key ^= self.zobrist("pellet", maze.cell_id((x, y)))
+        self.eaten_seen = len(board.eaten)
+
+        self.models = []
+        ghosts = []
+        for ghost in state.ghosts:
+            if ghost.eaten:
+                continue  # Respawns take longer than the search looks ahead
+            self.models.append(GhostModel(ghost, maze))
+            cell = maze.cell_id((ghost.x, ghost.y))
+            ghosts.append((cell, ROUTE if ghost.path else WANDER))
+        self.root_ghosts = tuple(ghosts)
+
+        # Distance from every cell to the nearest pellet at the root, and which pellet that is,
+        # one multi-source BFS; leaves whose branch ate that pellet search their own pellets
+        self.food_distance = [UNKNOWN] * maze.size
+        self.food_source = [None] * maze.size
+        self.food_memo = {}  # (cell, pellets) -> distance, for leaves whose nearest root pellet is eaten
+        queue = deque()
+        pellets = board.pellets
+        while pellets:
+            low = pellets & -pellets
+            pellets ^= low
+            cell = low.bit_length() - 1
+            self.food_distance[cell] = 0
+            self.food_source[cell] = cell
+            queue.append(cell)
+        while queue:
+            cell = queue.popleft()
+            for neighbor in maze.neighbors[cell]:
+                if self.food_distance[neighbor] == UNKNOWN:
+                    self.food_distance[neighbor] = self.food_distance[cell] + 1
+                    self.food_source[neighbor] = self.food_source[cell]
+                    queue.append(neighbor)
+
+    def _food_distance(self, pac, pellets):
+        """Steps from pac to the nearest pellet still in pellets; UNKNOWN if none is reachable"""
+        source = self.food_source[pac]
+        if source is None or pellets >> source & 1:
+            return self.food_distance[pac]  # The root's nearest pellet is still there, and none is closer
+        memo_key = (pac, pellets)
+        distance = self.food_memo.get(memo_key)
+        if distance is not None:
+            return distance
+        distance = self.food_memo[memo_key] = self._search_food(pac, pellets)
+        return distance
+
+    def _search_food(self, pac, pellets):
+        neighbors = self.maze.neighbors
+        seen = {pac}
+        frontier = [pac]
+        distance = 0
+        while frontier:
+            distance += 1
+            following = []
+            for cell in frontier:
+                for neighbor in neighbors[cell]:
+                    if neighbor not in seen:
+                        if pellets >> neighbor & 1:
+                            return distance
+                        seen.add(neighbor)
+                        following.append(neighbor)
+            frontier = following
+        return UNKNOWN
+
+    def _distance(self, a, b):
+        index = self.maze.index
+        return self.maze.dist[index[b] * self.n + index[a]]
+
+    def _key(self, ply, pac, ghosts, power, pellet_key):
+        key = pellet_key ^ self.zobrist("pacman", pac) ^ self.zobrist("tick", self.tick + ply)
+        key ^= self.zobrist("power", power)
+        for i, ghost in enumerate(ghosts):
+            key ^= self.zobrist(i, ghost)
+        return key
+
+    def _max(self, ply, depth, pac, ghosts, pellets, food, power, pellet_key):
+        """Best discounted value over Pacman's moves, and the move (a cell id) that gets it"""
+        self.nodes += 1
+        if self.nodes % CHECK_EVERY == 0 and self._spent():
+            raise SearchTimeout
+        if depth == 0:
+            return self._evaluate(pac, ghosts, power, pellets), None
+
+        key = self._key(ply, pac, ghosts, power, pellet_key)
+        entry = self.table.get(key)
+        if entry is not None and entry[0] >= depth:
+            return entry[1], entry[2]
+
+        moves = list(self.maze.neighbors[pac])
+        if entry is not None and entry[2] in moves:
+            moves.remove(entry[2])
+            moves.insert(0, entry[2])  # Best move of the shallower search first
+        best_value, best_move = None, None
+        for move in moves:
+            reward = 0.0
+            next_pellets, next_food, next_power, next_key = pellets, food, power, pellet_key
+            if pellets >> move & 1:
+                next_pellets = pellets & ~(1 << move)
+                next_food -= 1
+                next_key ^= self.zobrist("pellet", move)
+                if self.values[move] == POWER_PELLET:
+                    reward += 50
+                    next_power = self.fps * 10
+                else:
+                    reward += 10
+            if next_power > 0:
+                next_power -= 1
+            value = reward + self._chance(ply, depth, move, pac, ghosts, next_pellets, next_food,
+                                          next_power, next_key)
+            if best_value is None or value > best_value:
+                best_value, best_move = value, move
+
+        self.table.put(key, depth, best_value, best_move)
+        return best_value, best_move
+
+    def _chance(self, ply, depth, pac, prev, ghosts, pellets, food, power, pellet_key):
+        """Expected value over the ghosts' moves after Pacman stepped from prev to pac"""
+        outcomes = [self._ghost_moves(i, ghost, ply, pac, power, depth) for i, ghost in enumerate(ghosts)]
+        total = 0.0
+        count = 0
+        for moved in itertools.product(*outcomes):
+            count += 1
+            value = 0.0
+            dead = False
+            after = list(moved)
+            for i, (cell, mode) in enumerate(moved):
+                if mode == GONE:
+                    continue
+                # Same cell, or Pacman and the ghost swapped cells
+                if cell == pac or (cell == prev and ghosts[i][0] == pac):
+                    if power > 0:
+                        value += GHOST_EATEN
+                        after[i] = (-1, GONE)
+                    else:
+                        dead = True
+                        break
+            if dead:
+                total += DEATH
+            elif not food:
+                total += value + WIN
+            else:
+                total += value + DISCOUNT * self._max(ply + 1, depth - 1, pac, tuple(after), pellets, food,
+                                                      power, pellet_key)[0]
+        return total / count
+
+    def _ghost_moves(self, i, ghost, ply, pac, power, depth):
+        """Possible (cell, mode) of ghost i after this tick; several entries are equally likely"""
+        cell, mode = ghost
+        if mode == GONE:
+            return (ghost,)
+        model = self.models[i]
+        if model.replans(ply):
+            if model.algorithm == "random":
+                mode = WANDER
+            else:
+                mode = FLEE if power > 0 else pac
+                if model.algorithm == "bfs":
+                    return ((cell, mode),)  # Ghost.bfs paths start with the ghost's own cell
+        if mode == ROUTE:
+            if ply < len(model.route):
+                return ((model.route[ply], ROUTE),)
+            mode = WANDER
+        if mode >= 0:
+            if cell != mode:
+                hop = self.maze.next_hop[self.maze.index[mode] * self.n + self.maze.index[cell]]
+                if hop != NO_STEP:
+                    return ((cell + self.offsets[hop], mode),)
+            mode = WANDER  # Reached its target: the path is used up
+        neighbors = self.maze.neighbors[cell]
+        if mode == FLEE:
+            best = max(neighbors, key=lambda n: self._distance(n, pac), default=cell)
+            return ((best, FLEE),)
+        # Wandering: only worth branching on if it can still reach Pacman within the search
+        if not neighbors or self._distance(cell, pac) > 2 * depth:
+            return ((cell, WANDER),)
+        return tuple((n, WANDER) for n in neighbors)
+
+    def _evaluate(self, pac, ghosts, power, pellets):
+        food_distance = self._food_distance(pac, pellets)
+        value = -FOOD_WEIGHT * (food_distance if food_distance != UNKNOWN else self.maze.size)
+        for cell, mode in ghosts:
+            if mode == GONE:
+                continue
+            distance = self._distance(pac, cell)
+            if distance == UNREACHABLE:
+                continue
+            if power > distance:
+                value += GHOST_EATEN / 4 / (1 + distance)  # Catchable before the power runs out
+            elif not power and distance < DANGER_RADIUS:
+                value -= DANGER_WEIGHT * (DANGER_RADIUS - distance) ** 2
+        return value
+
+
+class BackgroundPlanner:
+    """Runs a planner on a worker thread, one tick ahead of the game.
+
+    game_loop calls submit() right after each step; the worker restores the
+    snapshot into a private copy of the game and plans the next tick while the
+    frame is drawn and the loop waits for the clock.  Calling this object for
+    that tick then just picks up the result, waiting at most `wait` seconds; a
+    late plan counts as a miss and the last completed plan is used instead.
+    Where threads are unavailable (pygbag in the browser) it plans inline.
+    """
+
+    def __init__(self, planner, wait=None):
+        self.planner = planner
+        self.wait = wait  # Seconds; None means WAIT_SHARE of a frame at the game's fps
+        self.threaded = platform.system() != "Emscripten"
+        self.condition = threading.Condition()
+        self.thread = None
+        self.closed = False
+        self.source = None    # Game being planned for
+        self.private = None   # The worker's own copy of it
+        self.job = None       # Snapshot waiting for the worker
+        self.pending = None   # Tick of the last submitted snapshot
+        self.done = None      # (copy, tick, direction) of the last finished plan
+        self.last = None
+        self.plans = 0
+        self.misses = 0
+        self.profiler = None  # Optional profiler.FrameProfiler: waits go to "plan.wait", late plans also to "plan.miss"
+
+    @property
+    def miss_rate(self):
+        """Share of plans that missed their frame, over the whole game; for scripts and tests"""
+        return self.misses / self.plans if self.plans else 0.0
+
+    def submit(self, state):
+        """Start planning for state's current tick in the background"""
+        if not self.threaded or state.finished:
+            return
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._work, name="planner", daemon=True)
+            self.thread.start()
+        snapshot = state.snapshot()
+        with self.condition:
+            if state is not self.source:
+                self.source, self.private = state, state.copy()
+                self.done, self.last = None, None
+            self.job = snapshot
+            self.pending = state.tick
+            self.condition.notify_all()
+
+    def __call__(self, state):
+        if not self.threaded:
+            return self.planner(state)
+        if state is not self.source or self.pending != state.tick:
+            self.submit(state)  # Nothing submitted for this tick yet, e.g. the first one
+        wait = self.wait if self.wait is not None else WAIT_SHARE / state.difficulty["fps"]
+
+        def ready():
+            return self.done is not None and self.done[0] is self.private and self.done[1] == state.tick
+
+        began = time.perf_counter()
+        with self.condition:
+            self.plans += 1
+            missed = not self.condition.wait_for(ready, timeout=wait)
+            if missed:
+                self.misses += 1
+            else:
+                self.last = self.done[2]
+            direction = self.last
+        if self.profiler is not None:
+            waited = time.perf_counter() - began
+            self.profiler.record("plan.wait", waited)
+            if missed:
+                self.profiler.record("plan.miss", waited)
+        return direction
+
+    def pace(self, ticks_per_second):
+        """Scale the search budget and the wait to a game running at this many ticks per second"""
+        self.wait = WAIT_SHARE / ticks_per_second
+        self.planner.budget = BUDGET_SHARE / ticks_per_second
+
+    def _work(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.job is not None or self.closed)
+                if self.closed:
+                    return
+                private, snapshot, self.job = self.private, self.job, None
+            private.restore(snapshot)
+            direction = self.planner(private)
+            with self.condition:
+                self.done = (private, snapshot.tick, direction)
+                self.condition.notify_all()
+
+    def close(self):
+        """Stop the worker thread"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
@@ -0,0 +1,108 @@
+"""Per-frame timing of the game loop's phases, kept over a rolling window of recent frames.
+
+    profiler = FrameProfiler()
+    with profiler.phase("events"):
+        ...
+    profiler.stats()            # {phase: {"count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"}}
+    profiler.watch("path_cache", path_cache.stats)  # Counters read whenever stats are shown or exported
+    profiler.export("profile.csv")  # or .json
+
+No pygame here, so headless games can be profiled the same way (GameState
+takes a profiler and times its own phases with it).
+"""
+import csv
+import json
+import time
+from collections import deque
+
+WINDOW = 600  # Samples kept per phase: half a minute at 20 ticks per second
+STAT_FIELDS = ["count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+
+
+class Phase:
+    """Context manager timing one phase; reused for every measurement of that phase"""
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = self.profiler.clock()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, self.profiler.clock() - self.started)
+        return False
+
+
+class FrameProfiler:
+    """Rolling window of durations per named phase, with percentiles and CSV/JSON export"""
+
+    def __init__(self, window=WINDOW, clock=time.perf_counter):
+        self.window = window
+        self.clock = clock
+        self.samples = {}  # Phase name -> deque of seconds, in the order phases were first seen
+        self.phases = {}
+        self.sources = {}  # Counter name -> callable returning {field: number}
+
+    def phase(self, name):
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = Phase(self, name)
+        return phase
+
+    def record(self, name, seconds):
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def clear(self):
+        self.samples.clear()
+
+    def watch(self, name, source):
+        """Report source() (a dict of numbers, e.g. cache hits and misses) next to the phase timings"""
+        self.sources[name] = source
+
+    def counters(self):
+        return {name: source() for name, source in self.sources.items()}
+
+    def stats(self):
+        """Count, mean and p50/p95/p99/max in milliseconds for every phase seen"""
+        result = {}
+        for name, samples in self.samples.items():
+            ordered = sorted(samples)
+            count = len(ordered)
+
+            def percentile(p):
+                return ordered[min(count - 1, int(p / 100 * count))] * 1000  # Nearest rank
+
+            result[name] = {
+                "count": count,
+                "mean_ms": sum(ordered) / count * 1000,
+                "p50_ms": percentile(50),
+                "p95_ms": percentile(95),
+                "p99_ms": percentile(99),
+                "max_ms": ordered[-1] * 1000,
+            }
+        return result
+
+    def export(self, path):
+        """Write stats() and counters() to a .json file, or to a .csv file with one row per phase
+        followed by one (counter, field, value) row per counter field"""
+        stats, counters = self.stats(), self.counters()
+        with open(path, "w", newline="") as file:
+            if path.endswith(".json"):
+                json.dump({"phases": stats, "counters": counters}, file, indent=2)
+            else:
+                writer = csv.writer(file)
+                writer.writerow(["phase"] + STAT_FIELDS)
+                for name, row in stats.items():
+                    writer.writerow([name] + [round(row[field], 4) for field in STAT_FIELDS])
+                if counters:
+                    writer.writerow([])
+                    writer.writerow(["counter", "field", "value"])
+                    for name, values in counters.items():
+                        for field, value in values.items():
+                            writer.writerow([name, field, round(value, 4)])
@@ -0,0 +1,188 @@
+"""Incremental shortest paths for a chaser whose target keeps moving (Moving Target D* Lite).
+
+A fresh search on every replan throws away everything the last one learned,
+although in between the ghost has only walked a few cells along its old path
+and Pacman has only moved a few cells.  MovingTargetSearch keeps its search
+tree (g, rhs and parent of every cell it touched, plus the open list) between
+calls and repairs it instead:
+
+- the start moved along the old tree: the subtree below the new start is still
+  exact, so only the rest of the old tree (found through child lists, without
+  visiting the subtree) is dropped and reached again from its fringe;
+- the target moved: the heuristic changed, and km absorbs the change so the
+  keys already in the open list stay valid lower bounds, as in D* Lite.
+
+The search then runs on until the new target is settled, so a replan costs
+roughly what changed instead of what the maze holds.
+"""
+import heapq
+
+INF = float("inf")
+
+
+class MovingTargetSearch:
+    """Shortest paths from a moving start to a moving target on one maze; path() repairs the last search"""
+
+    def __init__(self, maze):
+        self.maze = maze
+        self.start = None
+        self.target = None
+        self.km = 0         # Heuristic drift from target moves, added to every key
+        self.g = {}         # Cell id -> cost of the best path expanded so far
+        self.rhs = {}       # Cell id -> g of its parent plus one step; the start's is fixed
+        self.parent = {}
+        self.children = {}  # Cell id -> set of cells whose parent it is
+        self.open = []      # Heap of (key, cell); entries whose key no longer matches keys are stale
+        self.keys = {}      # Cell id -> key it is queued with
+        self.expanded = 0   # Cells expanded by the last path() call
+
+    def path(self, start, target):
+        """Shortest path from start to target, without start and ending at target; [] if unreachable"""
+        maze = self.maze
+        self.expanded = 0
+        if start == target or maze.is_wall(*start) or maze.is_wall(*target):
+            return []
+        start, target = maze.cell_id(start), maze.cell_id(target)
+
+        if self.target is not None and target != self.target:
+            self.km += self._heuristic(self.target, target)
+        self.target = target
+        if self.start is None or (start != self.start and not self._move_start(start)):
+            self._reset(start)
+        self._compute()
+
+        if self.rhs.get(target, INF) == INF:
+            return []
+        cells = []
+        cell = target
+        while cell != start:
+            cells.append(maze.cell_pos(cell))
+            cell = self.parent[cell]
+        cells.reverse()
+        return cells
+
+    def _heuristic(self, a, b):
+        width = self.maze.width
+        return abs(a % width - b % width) + abs(a // width - b // width)
+
+    def _key(self, cell):
+        best = min(self.g.get(cell, INF), self.rhs.get(cell, INF))
+        return (best + self._heuristic(cell, self.target) + self.km, best)
+
+    def _queue(self, cell):
+        """Queue cell with its current key if it is inconsistent, otherwise take it off the queue"""
+        if self.g.get(cell, INF) != self.rhs.get(cell, INF):
+            key = self._key(cell)
+            if self.keys.get(cell) != key:
+                self.keys[cell] = key
+                heapq.heappush(self.open, (key, cell))
+        else:
+            self.keys.pop(cell, None)
+
+    def _top(self):
+        open_list, keys = self.open, self.keys
+        while open_list:
+            key, cell = open_list[0]
+            if keys.get(cell) == key:
+                return key, cell
+            heapq.heappop(open_list)
+        return (INF, INF), None
+
+    def _reset(self, start):
+        self.start = start
+        self.km = 0
+        self.g.clear()
+        self.rhs.clear()
+        self.parent.clear()
+        self.children.clear()
+        self.open.clear()
+        self.keys.clear()
+        self.rhs[start] = 0
+        self._queue(start)
+
+    def _set_parent(self, cell, parent):
+        old = self.parent.pop(cell, None)
+        if old is not None:
+            self.children[old].discard(cell)
+        if parent is not None:
+            self.parent[cell] = parent
+            self.children.setdefault(parent, set()).add(cell)
+
+    def _move_start(self, start):
+        """Re-root the tree at start, keeping its subtree; False if start is not in the tree"""
+        g, rhs, parent, children = self.g, self.rhs, self.parent, self.children
+        if g.get(start, INF) == INF or rhs.get(start) != g[start]:
+            return False
+        cell = start
+        while cell != self.start:  # As long as the ghost walked, not as big as the tree
+            cell = parent.get(cell)
+            if cell is None:
+                return False
+
+        # Drop the old root's tree except the new start's subtree. The kept values are still
+        # measured from the old start, which only shifts every key by the same amount.
+        self._set_parent(start, None)
+        dropped = [self.start]
+        for cell in dropped:
+            dropped.extend(children.get(cell, ()))
+        for cell in dropped:
+            parent.pop(cell, None)  # Every parent is dropped too, so no child list to fix up
+            children.pop(cell, None)
+            g.pop(cell, None)
+            rhs.pop(cell, None)
+            self.keys.pop(cell, None)
+        self.start = start
+
+        # Dropped cells next to the kept subtree form the new fringe
+        neighbors = self.maze.neighbors
+        for cell in dropped:
+            best, via = INF, None
+            for neighbor in neighbors[cell]:
+                cost = g.get(neighbor, INF) + 1
+                if cost < best:
+                    best, via = cost, neighbor
+            if via is not None:
+                rhs[cell] = best
+                self._set_parent(cell, via)
+                self._queue(cell)
+        if len(self.open) > 2 * len(self.keys) + 64:
+            self.open = [(key, cell) for cell, key in self.keys.items()]
+            heapq.heapify(self.open)
+        return True
+
+    def _compute(self):
+        g, rhs, parent, neighbors = self.g, self.rhs, self.parent, self.maze.neighbors
+        target = self.target
+        while True:
+            key, cell = self._top()
+            if cell is None or (key >= self._key(target) and rhs.get(target, INF) <= g.get(target, INF)):
+                return
+            new_key = self._key(cell)
+            if key < new_key:
+                # Queued before the target moved: requeue with the real key
+                self.keys[cell] = new_key
+                heapq.heappush(self.open, (new_key, cell))
+                continue
+            heapq.heappop(self.open)
+            del self.keys[cell]
+            self.expanded += 1
+            if g.get(cell, INF) > rhs[cell]:
+                g[cell] = cost = rhs[cell]
+                for neighbor in neighbors[cell]:
+                    if neighbor != self.start and rhs.get(neighbor, INF) > cost + 1:
+                        rhs[neighbor] = cost + 1
+                        self._set_parent(neighbor, cell)
+                        self._queue(neighbor)
+            else:
+                g[cell] = INF
+                for neighbor in neighbors[cell]:
+                    if neighbor != self.start and parent.get(neighbor) == cell:
+                        best, via = INF, None
+                        for other in neighbors[neighbor]:
+                            cost = g.get(other, INF) + 1
+                            if cost < best:
+                                best, via = cost, other
+                        rhs[neighbor] = best
+                        self._set_parent(neighbor, via)
+                    self._queue(neighbor)
+                self._queue(cell)
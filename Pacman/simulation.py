@@ -0,0 +1,865 @@
+"""Headless game core: map, Pacman, ghosts and the rules that advance a game.
+
+Nothing here imports pygame or touches a display, so games can be stepped from
+scripts, tests and batch runs as fast as the CPU allows.  pacman.py draws a
+GameState and feeds it keyboard input; everything else about a game lives here.
+"""
+import copy
+import heapq
+import random
+import time
+from collections import Counter, deque
+from contextlib import nullcontext
+
+from danger import DangerField
+from maze import LEFT, DIRECTIONS, UNREACHABLE, Path, PathCache, compile_maze
+from replan import MovingTargetSearch
+
+# Game constants
+GRID_WIDTH = 19
+GRID_HEIGHT = 21
+
+# Cell values in the game map
+EMPTY = 0
+WALL = 1
+DOT = 2
+POWER_PELLET = 3
+
+# Game map
+MAP_LAYOUT = (
+    (1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1),
+    (1, 2, 2, 2, 2, 2, 2, 2, 2, 1, 2, 2, 2, 2, 2, 2, 2, 2, 1),
+    (1, 3, 1, 1, 2, 1, 1, 1, 2, 1, 2, 1, 1, 1, 2, 1, 1, 3, 1),
+    (1, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 1),
+    (1, 2, 1, 1, 2, 1, 2, 1, 1, 1, 1, 1, 2, 1, 2, 1, 1, 2, 1),
+    (1, 2, 2, 2, 2, 1, 2, 2, 2, 1, 2, 2, 2, 1, 2, 2, 2, 2, 1),
+    (1, 1, 1, 1, 2, 1, 1, 1, 0, 1, 0, 1, 1, 1, 2, 1, 1, 1, 1),
+    (0, 0, 0, 1, 2, 1, 0, 0, 0, 0, 0, 0, 0, 1, 2, 1, 0, 0, 0),
+    (1, 1, 1, 1, 2, 1, 0, 1, 1, 0, 1, 1, 0, 1, 2, 1, 1, 1, 1),
+    (0, 0, 0, 0, 2, 0, 0, 1, 0, 0, 0, 1, 0, 0, 2, 0, 0, 0, 0),
+    (1, 1, 1, 1, 2, 1, 0, 1, 1, 1, 1, 1, 0, 1, 2, 1, 1, 1, 1),
+    (0, 0, 0, 1, 2, 1, 0, 0, 0, 0, 0, 0, 0, 1, 2, 1, 0, 0, 0),
+    (1, 1, 1, 1, 2, 1, 0, 1, 1, 1, 1, 1, 0, 1, 2, 1, 1, 1, 1),
+    (1, 2, 2, 2, 2, 2, 2, 2, 2, 1, 2, 2, 2, 2, 2, 2, 2, 2, 1),
+    (1, 2, 1, 1, 2, 1, 1, 1, 2, 1, 2, 1, 1, 1, 2, 1, 1, 2, 1),
+    (1, 3, 2, 1, 2, 2, 2, 2, 2, 0, 2, 2, 2, 2, 2, 1, 2, 3, 1),
+    (1, 1, 2, 1, 2, 1, 2, 1, 1, 1, 1, 1, 2, 1, 2, 1, 2, 1, 1),
+    (1, 2, 2, 2, 2, 1, 2, 2, 2, 1, 2, 2, 2, 1, 2, 2, 2, 2, 1),
+    (1, 2, 1, 1, 1, 1, 1, 1, 2, 1, 2, 1, 1, 1, 1, 1, 1, 2, 1),
+    (1, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 1),
+    (1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1),
+)
+
+REGION_SIZE = 4  # Side of the square buckets the pellet index groups cells into
+
+INTENT_TTL = 0.5   # Seconds a buffered direction key stays usable
+MAX_INTENTS = 3    # Direction keys buffered ahead of the simulation
+
+# Paths found by Pacman.astar and the ghosts' bfs/dfs/astar, shared by every game in this process
+path_cache = PathCache()
+
+REPLAN_DISTANCE = 2  # Autoplay keeps chasing a ghost's old position until it strays this far
+
+# Default ghost line-up as (x, y, color, algorithm); the front end supplies colors
+DEFAULT_GHOSTS = [
+    (9, 9, None, "astar"),
+    (8, 9, None, "bfs"),
+    (10, 9, None, "dfs"),
+    (9, 8, None, "random"),
+]
+
+# Difficulty settings
+class Difficulty:
+    EASY = {"fps": 10, "ghost_update_freq": 10}
+    MEDIUM = {"fps": 15, "ghost_update_freq": 7}
+    HARD = {"fps": 20, "ghost_update_freq": 5}
+
+
+class BoardTemplate:
+    """Pristine pellet layout of one map, compiled once and copied by every Board built from it.
+
+    Cell values live in a flat bytearray indexed like the maze (y * width + x),
+    and the pellets in a big-int bitboard with one bit per cell.  Resetting a
+    board is then one bytearray copy, and the bitboard is an immutable int that
+    snapshots share for free.
+    """
+
+    def __init__(self, layout):
+        self.maze = compile_maze(layout)  # Cached per wall layout
+        self.width, self.height = self.maze.width, self.maze.height
+        self.cells = bytes(value for row in layout for value in row)
+        self.pellets = 0
+        for cell, value in enumerate(self.cells):
+            if value in (DOT, POWER_PELLET):
+                self.pellets |= 1 << cell
+        self.food = bin(self.pellets).count("1")
+
+        # (x // REGION_SIZE, y // REGION_SIZE) -> bitmask of the cells in that region; ANDed
+        # with a board's pellet bitboard it gives the pellets left in the region
+        self.regions = {}
+        for cell in range(self.maze.size):
+            x, y = cell % self.width, cell // self.width
+            key = (x // REGION_SIZE, y // REGION_SIZE)
+            self.regions[key] = self.regions.get(key, 0) | 1 << cell
+
+
+_templates = {}
+
+
+def board_template(layout):
+    """Return the compiled BoardTemplate for layout, building it only the first time"""
+    key = tuple(map(tuple, layout))
+    template = _templates.get(key)
+    if template is None:
+        template = _templates[key] = BoardTemplate(key)
+    return template
+
+
+class Board:
+    """Pellets of one game on top of the shared compiled wall layout.
+
+    The board is a copy of its layout's BoardTemplate: a bytearray of cell
+    values for drawing and a pellet bitboard plus remaining-food count that are
+    updated as pellets are eaten, so "any food left?", "is this food?" and
+    nearest-food queries never scan the map.
+    """
+
+    def __init__(self, layout=MAP_LAYOUT):
+        template = board_template(layout)
+        self.template = template
+        self.maze = template.maze
+        self.width = template.width
+        self.height = template.height
+        self.cells = bytearray(template.cells)
+        self.pellets = template.pellets  # Bit y * width + x is set while that cell holds food
+        self.food_left = template.food
+        self.eaten = []  # Cells emptied so far, in order; renderers use it to repaint only what changed
+
+    def copy(self):
+        """Independent board in the same state; costs one bytearray and one list copy"""
+        board = Board.__new__(Board)
+        board.template = self.template
+        board.maze = self.maze
+        board.width = self.width
+        board.height = self.height
+        board.cells = bytearray(self.cells)
+        board.pellets = self.pellets
+        board.food_left = self.food_left
+        board.eaten = list(self.eaten)
+        return board
+
+    def snapshot(self):
+        """Immutable copy of the pellet state, for restore()"""
+        return (bytes(self.cells), self.pellets, self.food_left, tuple(self.eaten))
+
+    def restore(self, data):
+        cells, self.pellets, self.food_left, eaten = data
+        self.cells[:] = cells
+        self.eaten[:] = eaten
+
+    def cell(self, x, y):
+        """Value of the map cell at (x, y): EMPTY, WALL, DOT or POWER_PELLET"""
+        return self.cells[y * self.width + x]
+
+    def is_wall(self, x, y):
+        return self.maze.is_wall(x, y)
+
+    def is_food(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height and self.pellets >> (y * self.width + x) & 1 == 1
+
+    def eat(self, x, y):
+        """Remove the dot or power pellet at (x, y) and return what was there"""
+        cell = y * self.width + x
+        value = self.cells[cell]
+        if value in (DOT, POWER_PELLET):
+            self.cells[cell] = EMPTY
+            self.eaten.append((x, y))
+            self.pellets &= ~(1 << cell)
+            self.food_left -= 1
+        return value
+
+    def has_food(self):
+        return self.food_left > 0
+
+    def nearest_food(self, start):
+        """Closest pellet to start by maze distance, searching region bitmasks in growing rings
+        around start; returns None when nothing is reachable or the maze has no distance tables.
+        Equally close pellets are ranked in BFS order from start, and a pellet on start itself does
+        not count, exactly like the flood this replaced"""
+        maze = self.maze
+        if not maze.has_tables or not self.food_left:
+            return None
+        if maze.is_wall(*start):
+            return None
+        # Distances are symmetric, so start's table row holds its distance to every cell
+        dist, index, width = maze.dist, maze.index, maze.width
+        regions = self.template.regions
+        row = index[maze.cell_id(start)] * len(maze.walkable)
+        x, y = start
+        rx, ry = x // REGION_SIZE, y // REGION_SIZE
+        max_ring = max(self.width, self.height) // REGION_SIZE + 1
+        closest, best_distance = [], None
+        for ring in range(max_ring + 1):
+            # Every cell in this ring is at least this many steps away, and maze distance is never shorter
+            if closest and best_distance <= (ring - 1) * REGION_SIZE:
+                break
+            for region_y in range(ry - ring, ry + ring + 1):
+                for region_x in range(rx - ring, rx + ring + 1):
+                    if max(abs(region_x - rx), abs(region_y - ry)) != ring:
+                        continue
+                    bits = self.pellets & regions.get((region_x, region_y), 0)
+                    while bits:
+                        low = bits & -bits
+                        bits ^= low
+                        cell = low.bit_length() - 1
+                        distance = dist[row + index[cell]]
+                        if not distance or distance == UNREACHABLE or (closest and distance > best_distance):
+                            continue
+                        if not closest or distance < best_distance:
+                            closest, best_distance = [cell], distance
+                        else:
+                            closest.append(cell)
+        if not closest:
+            return None
+        cell = closest[0] if len(closest) == 1 else self._first_reached(maze.cell_id(start), set(closest))
+        return (cell % width, cell // width)
+
+    def _first_reached(self, start, cells):
+        """Which of cells a BFS from start (neighbours in DIRECTIONS order) dequeues first"""
+        neighbors = self.maze.neighbors
+        seen = {start}
+        queue = deque([start])
+        while queue:
+            current = queue.popleft()
+            if current in cells:
+                return current
+            for neighbor in neighbors[current]:
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    queue.append(neighbor)
+        return None
+
+
+class InputBuffer:
+    """Direction keys sampled between ticks, oldest first, each stamped with when it was pressed.
+
+    The front end pushes every key press as soon as it sees it; Pacman.move()
+    takes one per tick, so quick successive turns pressed within one tick are
+    played on consecutive ticks instead of only the last one counting.
+    """
+
+    def __init__(self, ttl=INTENT_TTL, size=MAX_INTENTS, clock=time.perf_counter):
+        self.ttl = ttl
+        self.clock = clock
+        self.intents = deque(maxlen=size)  # (timestamp, direction); the oldest drop out when full
+
+    def push(self, direction, timestamp=None):
+        if self.intents and self.intents[-1][1] == direction:
+            return  # Key repeat or a double press: nothing new to do
+        self.intents.append((self.clock() if timestamp is None else timestamp, direction))
+
+    def pop(self):
+        """Oldest direction pressed within the last ttl seconds, or None"""
+        now = self.clock()
+        while self.intents:
+            timestamp, direction = self.intents.popleft()
+            if now - timestamp <= self.ttl:
+                return direction
+        return None
+
+    def clear(self):
+        self.intents.clear()
+
+    def __len__(self):
+        return len(self.intents)
+
+
+class Pacman:
+    def __init__(self):
+        self.x = 9
+        self.y = 15
+        self.direction = LEFT
+        self.next_direction = LEFT
+        self.score = 0
+        self.lives = 3
+        self.power_mode = False
+        self.power_timer = 0
+        self.fps = 10  # Thêm thuộc tính fps mặc định
+        self.prev_x = self.x
+        self.prev_y = self.y
+        self.path = Path()  # Path for autoplay, reused across ticks
+        self.intents = InputBuffer()  # Keys pressed since the last tick
+        self.danger = None  # DangerField for the maze autoplay last ran on
+
+    def move(self, board):
+        # Store previous position before moving
+        self.prev_x, self.prev_y = self.x, self.y
+
+        intent = self.intents.pop()
+        if intent is not None:
+            self.next_direction = intent
+
+        next_x = self.x + self.next_direction[0]
+        next_y = self.y + self.next_direction[1]
+
+        if not board.is_wall(next_x, next_y):
+            self.direction = self.next_direction
+
+        next_x = self.x + self.direction[0]
+        next_y = self.y + self.direction[1]
+
+        if not board.is_wall(next_x, next_y):
+            self.x = next_x
+            self.y = next_y
+
+            eaten = board.eat(self.x, self.y)
+            # Collect dots
+            if eaten == DOT:
+                self.score += 10
+
+            # Collect power pellets
+            elif eaten == POWER_PELLET:
+                self.score += 50
+                self.power_mode = True
+                self.power_timer = self.fps * 10
+
+        if self.power_mode:
+            self.power_timer -= 1
+            if self.power_timer <= 0:
+                self.power_mode = False
+
+    def snapshot(self):
+        """Everything move() and autoplay_move() change, as an immutable tuple"""
+        return (self.x, self.y, self.direction, self.next_direction, self.score, self.lives,
+                self.power_mode, self.power_timer, self.fps, self.prev_x, self.prev_y, self.path.snapshot())
+
+    def restore(self, data, maze=None):
+        (self.x, self.y, self.direction, self.next_direction, self.score, self.lives,
+         self.power_mode, self.power_timer, self.fps, self.prev_x, self.prev_y, path) = data
+        self.path.restore(path, maze)
+
+    def astar(self, start, target, maze):
+        return path_cache.lookup("astar", start, target, maze, lambda s, t: astar(s, t, maze))
+
+    def update_danger(self, ghosts, maze):
+        """Bring the threat map up to date with this tick's ghosts"""
+        if self.danger is None or self.danger.maze is not maze:
+            self.danger = DangerField(maze)
+        self.danger.update(ghosts, self.power_mode)
+
+    def evaluate_danger(self, ghosts, position=None):
+        """Heuristic to evaluate danger from ghosts, at Pacman's cell or the given one: a lookup in
+        the threat map once update_danger() has run, Manhattan distance to each ghost before that"""
+        x, y = position if position is not None else (self.x, self.y)
+        if self.danger is not None:
+            return self.danger.at((x, y))
+        total_danger = 0
+        for ghost in ghosts:
+            if not ghost.eaten and not self.power_mode:  # Only consider active ghosts when not in power mode
+                distance = abs(x - ghost.x) + abs(y - ghost.y)
+                if distance < 3:  # Consider ghosts within 3 cells as highly dangerous
+                    total_danger += (3 - distance) * 2  # Higher penalty for closer ghosts
+        return total_danger
+
+    def find_nearest(self, is_target, maze):
+        """Flood outward from Pacman with BFS and stop at the first cell accepted by is_target.
+        Returns (target, path) with path in the same format as astar, or (None, []) if nothing is reachable"""
+        start = maze.cell_id((self.x, self.y))
+        came_from = {start: None}
+        queue = deque([start])
+
+        while queue:
+            current = queue.popleft()
+
+            if current != start and is_target(maze.cell_pos(current)):
+                target = maze.cell_pos(current)
+                path = []
+                while current != start:
+                    path.append(maze.cell_pos(current))
+                    current = came_from[current]
+                path.reverse()
+                return target, path
+
+            for neighbor in maze.neighbors[current]:
+                if neighbor not in came_from:
+                    came_from[neighbor] = current
+                    queue.append(neighbor)
+
+        return None, []
+
+    def find_nearest_food(self, board):
+        """Find the nearest dot or power pellet and the path to it, from the pellet index when the
+        maze has distance tables and with a single BFS flood otherwise"""
+        start = (self.x, self.y)
+        target = board.nearest_food(start)
+        if target is not None:
+            return target, board.maze.path(start, target)
+        return self.find_nearest(lambda cell: board.is_food(*cell), board.maze)
+
+    def find_nearest_ghost(self, ghosts, maze):
+        """Find the nearest active ghost and the path to it from the maze tables"""
+        ghost_cells = {(ghost.x, ghost.y) for ghost in ghosts if not ghost.eaten}  # Only chase active ghosts
+        ghost_cells.discard((self.x, self.y))
+        if not ghost_cells:
+            return None, []
+        if not maze.has_tables:
+            return self.find_nearest(ghost_cells.__contains__, maze)
+        start = (self.x, self.y)
+        reachable = [(maze.distance(start, cell), cell) for cell in ghost_cells]
+        reachable = [entry for entry in reachable if entry[0] is not None]
+        if not reachable:
+            return None, []
+        target = min(reachable)[1]
+        return target, maze.path(start, target)
+
+    def choose_safe_direction(self, ghosts, maze):
+        """Choose a direction that minimizes danger from ghosts"""
+        best_direction = self.direction
+        min_danger = float('inf')
+        for dx, dy in DIRECTIONS:
+            next_x, next_y = self.x + dx, self.y + dy
+            if not maze.is_wall(next_x, next_y):
+                danger = self.evaluate_danger(ghosts, (next_x, next_y))
+                if danger < min_danger:
+                    min_danger = danger
+                    best_direction = (dx, dy)
+        return best_direction
+
+    def follow_path(self, ghosts, maze):
+        """Steer toward the next cell of the current plan, or away from danger if there is none"""
+        if self.path:
+            next_pos = self.path.advance()
+            dx = next_pos[0] - self.x
+            dy = next_pos[1] - self.y
+            self.next_direction = (dx, dy)
+        else:
+            self.next_direction = self.choose_safe_direction(ghosts, maze)
+
+    def autoplay_move(self, ghosts, board):
+        """Logic for autoplay: prioritize eating food to win, chase ghosts only when safe or necessary.
+        The current plan is kept across ticks and only replaced once it is used up, no longer fits
+        Pacman's position, or its target has gone away"""
+        maze = board.maze
+        self.update_danger(ghosts, maze)
+        # Check if there is any food left
+        has_food = board.has_food()
+
+        # Evaluate danger level
+        danger = self.evaluate_danger(ghosts)
+        position = (self.x, self.y)
+
+        if has_food:
+            # Prioritize eating food unless danger is too high
+            if danger > 4:  # High danger threshold to trigger avoidance
+                self.next_direction = self.choose_safe_direction(ghosts, maze)
+                self.path.clear()  # Clear path to prioritize avoiding
+            else:
+                target = self.path.target
+                if (not self.path.is_valid(maze, position) or target is None
+                        or not board.is_food(*target)):  # Target already eaten
+                    target, cells = self.find_nearest_food(board)
+                    self.path.replace(cells, target, maze)
+                self.follow_path(ghosts, maze)
+        else:
+            # No food left, prioritize chasing ghosts if in power mode or if safe
+            if self.power_mode or danger == 0:
+                target = self.path.target
+                if (not self.path.is_valid(maze, position) or target is None or
+                        not any(abs(ghost.x - target[0]) + abs(ghost.y - target[1]) <= REPLAN_DISTANCE
+                                for ghost in ghosts if not ghost.eaten)):  # Chased ghost moved too far
+                    target, cells = self.find_nearest_ghost(ghosts, maze)
+                    self.path.replace(cells, target, maze)
+                self.follow_path(ghosts, maze)
+            else:
+                # Avoid ghosts if not in power mode and no food left
+                self.next_direction = self.choose_safe_direction(ghosts, maze)
+                self.path.clear()
+
+
+class Ghost:
+    def __init__(self, x, y, color, algorithm, ghost_update_freq, rng=None):
+        self.x = x
+        self.y = y
+        self.color = color
+        self.algorithm = algorithm
+        self.ghost_update_freq = ghost_update_freq
+        self.rng = rng or random  # Seeded games pass their own generator
+        self.direction = self.rng.choice(DIRECTIONS)
+        self.target_x = 0
+        self.target_y = 0
+        self.scared = False
+        self.path = Path()
+        self.search = None  # replan.MovingTargetSearch kept between replans by "dstar" ghosts
+        self.update_counter = 0
+        self.eaten = False  # Flag to indicate if ghost is eaten
+        self.start_x = 9  # Fixed starting position at the center (9, 9)
+        self.start_y = 9
+        self.prev_x = self.x  # Track previous position for better collision detection
+        self.prev_y = self.y
+        self.has_corpse = False  # Flag to indicate if ghost has a corpse
+        self.respawn_timer = 0  # Timer for respawn
+        self.glow_timer = 0  # Timer for glow effect
+
+    def snapshot(self):
+        """Everything move() and check_collision() change, as an immutable tuple"""
+        return (self.x, self.y, self.direction, self.target_x, self.target_y, self.scared,
+                self.update_counter, self.eaten, self.prev_x, self.prev_y, self.has_corpse,
+                self.respawn_timer, self.glow_timer, self.path.snapshot())
+
+    def restore(self, data, maze=None):
+        (self.x, self.y, self.direction, self.target_x, self.target_y, self.scared,
+         self.update_counter, self.eaten, self.prev_x, self.prev_y, self.has_corpse,
+         self.respawn_timer, self.glow_timer, path) = data
+        self.path.restore(path, maze)
+
+    def set_target(self, pacman, maze):
+        if self.scared:
+            # Flee to the farthest reachable cell from Pacman by maze distance; every scared
+            # ghost shares the maze's answer for Pacman's cell
+            farthest = maze.farthest_from((pacman.x, pacman.y))
+            if farthest is not None:
+                self.target_x, self.target_y = farthest
+        else:
+            self.target_x = pacman.x
+            self.target_y = pacman.y
+
+    def move(self, pacman, maze):
+        # Store previous position before moving
+        self.prev_x, self.prev_y = self.x, self.y
+
+        # Update glow timer
+        if self.has_corpse:
+            self.glow_timer += 1
+
+        # Update respawn logic
+        if self.eaten:
+            self.respawn_timer += 1
+            if self.respawn_timer >= pacman.fps * 3:  # Respawn after 3 seconds
+                self.eaten = False
+                self.has_corpse = False
+                self.respawn_timer = 0
+                self.glow_timer = 0
+            return  # Don't move while eaten
+
+        # Only move if ghost is not eaten
+        self.update_counter += 1
+
+        if self.update_counter >= self.ghost_update_freq:
+            self.update_counter = 0
+            self.set_target(pacman, maze)
+            start, target = (self.x, self.y), (self.target_x, self.target_y)
+
+            if not self.scared and self.algorithm in ("astar", "bfs"):
+                # Chasers share one flow field toward Pacman instead of each running its own search;
+                # both algorithms return shortest paths, so only the search cost changes
+                cells = maze.flow_field(target).path_from(start)
+                if self.algorithm == "bfs" and (cells or start == target):
+                    cells.insert(0, start)  # Ghost.bfs paths start with the ghost's own cell, even on the target
+            elif self.algorithm == "bfs":
+                cells = self.bfs(start, target, maze)
+            elif self.algorithm == "dfs":
+                cells = self.dfs(start, target, maze)
+            elif self.algorithm == "astar":
+                cells = self.astar(start, target, maze)
+            elif self.algorithm == "dstar":
+                cells = self.dstar(start, target, maze)
+            else:
+                cells = []
+            self.path.replace(cells, target, maze)
+
+        if self.path and not self.path.is_valid(maze, (self.x, self.y)):
+            self.path.clear()  # Ghost was moved (e.g. sent home after a capture), wait for the next replan
+
+        if self.path:
+            self.x, self.y = self.path.advance()
+        else:
+            possible_moves = []
+            for dx, dy in DIRECTIONS:
+                next_x, next_y = self.x + dx, self.y + dy
+                if not maze.is_wall(next_x, next_y):
+                    possible_moves.append((dx, dy))
+
+            if possible_moves:
+                self.direction = self.rng.choice(possible_moves)
+                self.x += self.direction[0]
+                self.y += self.direction[1]
+
+    def bfs(self, start, target, maze):
+        return path_cache.lookup("bfs", start, target, maze, maze.bfs)
+
+    def dfs(self, start, target, maze):
+        return path_cache.lookup("dfs", start, target, maze, maze.dfs)
+
+    def astar(self, start, target, maze):
+        return path_cache.lookup("astar", start, target, maze, lambda s, t: astar(s, t, maze))
+
+    def dstar(self, start, target, maze):
+        """Repair the last search instead of starting over; same path format as astar"""
+        if self.search is None or self.search.maze is not maze:
+            self.search = MovingTargetSearch(maze)
+        return self.search.path(start, target)
+
+
+def astar(start, target, maze):
+    """A* over the maze, returning the path without start and ending at target"""
+    if not maze.has_tables and not maze.is_wall(*start):
+        # No exact heuristic on big mazes: search the corridor-compressed graph instead of every cell
+        return maze.junctions.path(start, target)
+
+    def heuristic(a, b):
+        # Exact maze distance keeps the search on the shortest path; Manhattan if unknown
+        distance = maze.distance(a, b)
+        return distance if distance is not None else abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+    # A cell is pushed again whenever a shorter route to it turns up; the older, worse
+    # entries are skipped when they surface
+    open_set = [(heuristic(start, target), start)]
+    came_from = {}
+    g_score = {start: 0}
+    closed = set()
+
+    while open_set:
+        current = heapq.heappop(open_set)[1]
+        if current in closed:
+            continue
+        closed.add(current)
+
+        if current == target:
+            path = []
+            while current in came_from:
+                path.append(current)
+                current = came_from[current]
+            path.reverse()
+            return path
+
+        for dx, dy in DIRECTIONS:
+            neighbor = (current[0] + dx, current[1] + dy)
+            if not maze.is_wall(*neighbor):
+                tentative_g_score = g_score[current] + 1
+                if neighbor not in g_score or tentative_g_score < g_score[neighbor]:
+                    came_from[neighbor] = current
+                    g_score[neighbor] = tentative_g_score
+                    heapq.heappush(open_set, (tentative_g_score + heuristic(neighbor, target), neighbor))
+
+    return []
+
+
+def check_collision(pacman, ghosts):
+    """Resolve Pacman touching ghosts; returns the ghost that cost Pacman a life, or None"""
+    for ghost in ghosts:
+        # Check if Pacman and ghost are in the same position
+        if pacman.x == ghost.x and pacman.y == ghost.y:
+            if pacman.power_mode and not ghost.eaten:
+                # Ghost is eaten, create corpse at spawn point
+                ghost.eaten = True
+                ghost.has_corpse = True
+                ghost.respawn_timer = 0  # Start respawn timer
+                ghost.x = ghost.start_x  # Move to spawn point
+                ghost.y = ghost.start_y
+                pacman.score += 200
+            elif not pacman.power_mode and not ghost.eaten:
+                # Pacman loses a life
+                pacman.lives -= 1
+                if pacman.lives > 0:
+                    pacman.x, pacman.y = 9, 15
+                    for g in ghosts:
+                        if not g.eaten:
+                            g.x, g.y = 9, 9
+                return ghost
+        # Additional check for crossing paths (Pacman and ghost swap positions)
+        elif (pacman.x == ghost.prev_x and pacman.y == ghost.prev_y and
+              pacman.prev_x == ghost.x and pacman.prev_y == ghost.y):
+            if pacman.power_mode and not ghost.eaten:
+                # Ghost is eaten, create corpse at spawn point
+                ghost.eaten = True
+                ghost.has_corpse = True
+                ghost.respawn_timer = 0  # Start respawn timer
+                ghost.x = ghost.start_x  # Move to spawn point
+                ghost.y = ghost.start_y
+                pacman.score += 200
+            elif not pacman.power_mode and not ghost.eaten:
+                # Pacman loses a life
+                pacman.lives -= 1
+                if pacman.lives > 0:
+                    pacman.x, pacman.y = 9, 15
+                    for g in ghosts:
+                        if not g.eaten:
+                            g.x, g.y = 9, 9
+                return ghost
+    return None
+
+
+def check_win(board):
+    return not board.has_food()
+
+
+def untimed(name):
+    """Stand-in for FrameProfiler.phase when a game is not being profiled"""
+    return nullcontext()
+
+
+class Snapshot:
+    """Frozen copy of everything a GameState changes while it plays, taken by GameState.snapshot().
+
+    Only immutable values are stored, so one snapshot can be restored any number
+    of times and handed to other threads or processes.
+    """
+    __slots__ = ("board", "pacman", "ghosts", "rng", "tick", "game_over", "win", "lives_lost", "captures")
+
+    def __init__(self, state):
+        self.board = state.board.snapshot()
+        self.pacman = state.pacman.snapshot()
+        self.ghosts = tuple(ghost.snapshot() for ghost in state.ghosts)
+        self.rng = state.rng.getstate()
+        self.tick = state.tick
+        self.game_over = state.game_over
+        self.win = state.win
+        self.lives_lost = state.lives_lost
+        self.captures = tuple(state.captures.items())
+
+
+class GameState:
+    """One game in progress: the board, Pacman, the ghosts and the outcome so far.
+
+    step() advances exactly one simulation tick, the same work game_loop does
+    between two frames, without drawing anything.
+    """
+
+    def __init__(self, difficulty=Difficulty.MEDIUM, autoplay=False, seed=None, ghosts=DEFAULT_GHOSTS,
+                 planner=None):
+        self.difficulty = difficulty
+        self.autoplay = autoplay
+        self.planner = planner  # Autoplay engine called with the state; greedy autoplay_move when None
+        self.profiler = None  # Optional profiler.FrameProfiler timing each phase of step()
+        self.rng = random.Random(seed)
+        self.board = Board()
+        self.pacman = Pacman()
+        self.pacman.fps = difficulty["fps"]
+        self.ghosts = [Ghost(x, y, color, algorithm, difficulty["ghost_update_freq"], self.rng)
+                       for x, y, color, algorithm in ghosts]
+        self.tick = 0
+        self.game_over = False
+        self.win = False
+        self.lives_lost = 0
+        self.captures = Counter()  # Lives taken, keyed by the catching ghost's algorithm
+
+    @property
+    def finished(self):
+        return self.game_over or self.win
+
+    def snapshot(self):
+        """Capture the game as it is now; restore() puts it back exactly"""
+        return Snapshot(self)
+
+    def restore(self, snapshot):
+        """Rewind (or fast-forward) this game to a snapshot taken from it or from a copy of it"""
+        self.board.restore(snapshot.board)
+        maze = self.board.maze
+        self.pacman.restore(snapshot.pacman, maze)
+        for ghost, data in zip(self.ghosts, snapshot.ghosts):
+            ghost.restore(data, maze)
+        self.rng.setstate(snapshot.rng)
+        self.tick = snapshot.tick
+        self.game_over = snapshot.game_over
+        self.win = snapshot.win
+        self.lives_lost = snapshot.lives_lost
+        self.captures = Counter(dict(snapshot.captures))
+
+    def copy(self):
+        """Independent game in the same state, with its own board, actors and random generator,
+        for trying moves ahead without disturbing this one"""
+        clone = GameState.__new__(GameState)
+        clone.difficulty = self.difficulty
+        clone.autoplay = self.autoplay
+        clone.planner = self.planner
+        clone.profiler = None
+        clone.rng = random.Random()
+        clone.board = self.board.copy()
+        clone.pacman = copy.copy(self.pacman)
+        clone.pacman.path = Path()
+        clone.pacman.intents = InputBuffer()
+        clone.pacman.danger = None
+        clone.ghosts = []
+        for ghost in self.ghosts:
+            ghost = copy.copy(ghost)
+            ghost.rng = clone.rng
+            ghost.path = Path()
+            ghost.search = None
+            clone.ghosts.append(ghost)
+        clone.restore(self.snapshot())
+        return clone
+
+    def step(self):
+        if self.finished:
+            return
+        phase = self.profiler.phase if self.profiler is not None else untimed
+
+        # Autoplay logic
+        if self.autoplay:
+            with phase("autoplay"):
+                direction = self.planner(self) if self.planner is not None else None
+                if direction is not None:
+                    self.pacman.next_direction = direction
+                else:
+                    self.pacman.autoplay_move(self.ghosts, self.board)
+
+        with phase("pacman"):
+            self.pacman.move(self.board)
+        for ghost in self.ghosts:
+            with phase("ghost." + ghost.algorithm):
+                ghost.scared = self.pacman.power_mode
+                ghost.move(self.pacman, self.board.maze)
+
+        with phase("collision"):
+            catcher = check_collision(self.pacman, self.ghosts)
+        if catcher:
+            self.lives_lost += 1
+            self.captures[catcher.algorithm] += 1
+            if self.pacman.lives <= 0:
+                self.game_over = True
+
+        with phase("win"):
+            if check_win(self.board):
+                self.win = True
+        self.tick += 1
+
+
+class Simulator:
+    """Plays whole games headlessly, as fast as the CPU allows.
+
+    controller, if given, is called with the GameState before every tick and may
+    return a direction for Pacman; otherwise Pacman follows autoplay (or keeps
+    going straight when autoplay is off).
+    """
+
+    def __init__(self, difficulty=Difficulty.MEDIUM, autoplay=True, ghosts=DEFAULT_GHOSTS,
+                 max_ticks=5000, controller=None, planner=None):
+        self.difficulty = difficulty
+        self.autoplay = autoplay
+        self.planner = planner
+        self.ghosts = ghosts
+        self.max_ticks = max_ticks
+        self.controller = controller
+
+    def new_game(self, seed=None):
+        return GameState(self.difficulty, self.autoplay, seed, self.ghosts, self.planner)
+
+    def play(self, seed=None):
+        """Run one game to the end (or max_ticks) and return a summary of how it went"""
+        state = self.new_game(seed)
+        while not state.finished and state.tick < self.max_ticks:
+            if self.controller is not None:
+                direction = self.controller(state)
+                if direction is not None:
+                    state.pacman.next_direction = direction
+            state.step()
+        return {
+            "seed": seed,
+            "win": state.win,
+            "game_over": state.game_over,
+            "score": state.pacman.score,
+            "lives": state.pacman.lives,
+            "lives_lost": state.lives_lost,
+            "ticks": state.tick,
+            "captures": dict(state.captures),
+        }
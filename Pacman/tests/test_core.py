@@ -0,0 +1,115 @@
+"""Checks for the headless core: incremental searches, snapshots and path validity.
+
+    python -m pytest tests        (or: python -m unittest discover tests)
+"""
+import os
+import random
+import sys
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from bench_search import generate_maze  # noqa: E402
+from maze import WALL, JunctionGraph, Maze, Path  # noqa: E402
+from replan import MovingTargetSearch  # noqa: E402
+from simulation import DEFAULT_GHOSTS, Difficulty, GameState  # noqa: E402
+
+
+def walk_is_valid(maze, start, path):
+    """Every step of path moves one cell from the one before it and lands off the walls"""
+    previous = start
+    for x, y in path:
+        if maze.is_wall(x, y) or abs(x - previous[0]) + abs(y - previous[1]) != 1:
+            return False
+        previous = (x, y)
+    return True
+
+
+class SearchTest(unittest.TestCase):
+    """dstar and the junction graph find paths as short as a plain BFS"""
+
+    def mazes(self):
+        rng = random.Random(7)
+        for width, height in [(19, 21), (31, 31), (81, 81)]:  # The last is too big for distance tables
+            for loops in (0.0, 0.1, 0.3):
+                yield Maze(generate_maze(width, height, rng, loops)), rng
+
+    def test_junction_graph_matches_bfs(self):
+        for maze, rng in self.mazes():
+            graph = JunctionGraph(maze)
+            for _ in range(40):
+                start, target = (maze.cell_pos(rng.choice(maze.walkable)) for _ in range(2))
+                path = graph.path(start, target)
+                self.assertEqual(len(path), len(maze.bfs(start, target)) - 1, (start, target))
+                self.assertTrue(walk_is_valid(maze, start, path))
+
+    def test_dstar_matches_bfs_while_both_ends_move(self):
+        for maze, rng in self.mazes():
+            search = MovingTargetSearch(maze)
+            start, target = (maze.cell_pos(rng.choice(maze.walkable)) for _ in range(2))
+            for _ in range(60):
+                path = search.path(start, target)
+                self.assertEqual(len(path), max(len(maze.bfs(start, target)) - 1, 0), (start, target))
+                self.assertTrue(walk_is_valid(maze, start, path))
+                # The chaser walks a few cells of its path (re-rooting the tree), the target wanders
+                if path:
+                    start = path[min(rng.randrange(3), len(path) - 1)]
+                for _ in range(rng.randrange(3)):
+                    target = maze.cell_pos(rng.choice(maze.neighbors[maze.cell_id(target)]))
+
+
+class SnapshotTest(unittest.TestCase):
+    def play(self, state, ticks):
+        trace = []
+        for _ in range(ticks):
+            state.step()
+            trace.append(((state.pacman.x, state.pacman.y), state.pacman.score, state.lives_lost,
+                          tuple((ghost.x, ghost.y) for ghost in state.ghosts)))
+        return trace
+
+    def test_restore_replays_the_same_ticks(self):
+        for seed in range(3):
+            # A dstar ghost too: its search tree is dropped on restore and must rebuild the same paths
+            ghosts = DEFAULT_GHOSTS[:3] + [(9, 8, None, "dstar")]
+            state = GameState(Difficulty.HARD, autoplay=True, seed=seed, ghosts=ghosts)
+            self.play(state, 40)
+            snapshot = state.snapshot()
+            clone = state.copy()
+            first = self.play(state, 200)
+            state.restore(snapshot)
+            self.assertEqual(self.play(state, 200), first)
+            self.assertEqual(self.play(clone, 200), first)
+
+
+class PathTest(unittest.TestCase):
+    def test_is_valid_rechecks_walls_on_a_new_maze(self):
+        grid = generate_maze(19, 21, random.Random(3), 0.2)
+        maze = Maze(grid)
+        start = maze.cell_pos(maze.walkable[0])
+        target = max((maze.cell_pos(cell) for cell in maze.walkable), key=lambda cell: len(maze.bfs(start, cell)))
+        cells = maze.bfs(start, target)[1:]
+        path = Path(cells, maze=maze)
+        self.assertTrue(path.is_valid(maze, start))
+
+        # Same walls compiled again: a new version, and the path still holds
+        same = Maze(grid)
+        self.assertNotEqual(same.version, maze.version)
+        self.assertTrue(path.is_valid(same, start))
+        self.assertIs(path.maze, same)
+
+        # A wall dropped onto the route: the path must be thrown away
+        x, y = cells[len(cells) // 2]
+        blocked = [row[:] for row in grid]
+        blocked[y][x] = WALL
+        self.assertFalse(path.is_valid(Maze(blocked), start))
+
+        # A snapshot taken on the old walls does not bind to the new maze
+        restored = Path()
+        restored.restore(path.snapshot(), Maze(blocked))
+        self.assertIsNone(restored.maze)
+
+
+if __name__ == "__main__":
+    unittest.main()